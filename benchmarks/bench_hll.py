@@ -0,0 +1,42 @@
+"""Exact visitor sets vs. HyperLogLog sketches for unique-visitor counts.
+
+For each POI size the script builds the exact set that get_poi_popularity
+materialises and a HyperLogLog sketch, and reports memory and relative error.
+
+Usage: python benchmarks/bench_hll.py [error]
+"""
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'modules'))
+
+from sketches import HyperLogLog
+
+
+def set_bytes(values: set) -> int:
+    #The set table plus the int objects it references
+    return sys.getsizeof(values) + sum(sys.getsizeof(v) for v in values)
+
+
+def sketch_bytes(sketch: HyperLogLog) -> int:
+    if sketch._dense is not None:
+        return sys.getsizeof(sketch) + sys.getsizeof(sketch._dense)
+    return sys.getsizeof(sketch) + sys.getsizeof(sketch._sparse)
+
+
+def main():
+    error = float(sys.argv[1]) if len(sys.argv) > 1 else 0.01
+    print(f"target standard error: {error:.3%}")
+    print(f"{'visitors':>10} {'set bytes':>12} {'hll bytes':>10} {'estimate':>10} {'rel. error':>10}")
+    for n in (10, 100, 1_000, 10_000, 100_000, 1_000_000):
+        visitors = set(range(1_000_000, 1_000_000 + n))
+        sketch = HyperLogLog(error)
+        for visitor_id in visitors:
+            sketch.add(visitor_id)
+        estimate = sketch.count()
+        print(f"{n:>10} {set_bytes(visitors):>12} {sketch_bytes(sketch):>10} {estimate:>10} "
+              f"{abs(estimate - n) / n:>10.3%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+"""Memory per POI and per visit as a POIManager grows.
+
+For each size the script loads POIs, then visits, and reports the bytes each
+phase allocated per item (tracemalloc snapshots) next to the deep-size total
+from get_memory_report. tracemalloc sees every allocation, including index
+and change-feed overhead, but slows the loads down; the deep-size report is
+cheaper and splits the total per structure. With --plot the curves are
+written to a PNG if matplotlib is installed.
+
+Usage: python benchmarks/bench_memory.py [max_pois] [--plot memory.png]
+"""
+import os
+import random
+import sys
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'modules'))
+
+from models import POIManager
+
+VISITS_PER_POI = 5
+VISITS_PER_VISITOR = 20
+
+
+def build(n: int, rng: random.Random):
+    """(manager, bytes per POI, bytes per visit) measured with tracemalloc"""
+    manager = POIManager()
+    manager.add_poi_type('cafe')
+    manager.add_attribute_to_type('cafe', 'seats')
+
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    poi_ids = [manager.add_poi(f'poi{i}', 'cafe', rng.randrange(manager.map_size),
+                               rng.randrange(manager.map_size), {'seats': rng.randrange(100)})
+               for i in range(n)]
+    after_pois = tracemalloc.take_snapshot()
+    visits = n * VISITS_PER_POI
+    for v in range(visits // VISITS_PER_VISITOR):
+        visitor = manager.add_visitor(f'visitor{v}', rng.choice(('IT', 'FR', 'DE')))
+        for _ in range(VISITS_PER_VISITOR):
+            manager.add_visit(visitor.id, rng.choice(poi_ids),
+                              f'{rng.randrange(1, 29):02d}/{rng.randrange(1, 13):02d}/2024', rng.randrange(1, 11))
+    after_visits = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+
+    poi_bytes = sum(s.size_diff for s in after_pois.compare_to(before, 'filename'))
+    visit_bytes = sum(s.size_diff for s in after_visits.compare_to(after_pois, 'filename'))
+    return manager, poi_bytes / n, visit_bytes / visits
+
+
+def main():
+    args = sys.argv[1:]
+    plot = None
+    if '--plot' in args:
+        plot = args[args.index('--plot') + 1]
+        del args[args.index('--plot'):args.index('--plot') + 2]
+    max_pois = int(args[0]) if args else 20_000
+    sizes = [n for n in (1_000, 2_000, 5_000, 10_000, 20_000, 50_000, 100_000) if n <= max_pois]
+
+    rng = random.Random(1)
+    rows = []
+    print(f"{'pois':>8} {'visits':>8} {'B/poi':>8} {'B/visit':>8} {'report MB':>10}  largest structures")
+    for n in sizes:
+        manager, per_poi, per_visit = build(n, rng)
+        report = manager.get_memory_report(sample=1000)
+        total = report.pop('total')['bytes']
+        largest = sorted(report.items(), key=lambda item: -item[1]['bytes'])[:3]
+        print(f"{n:>8} {n * VISITS_PER_POI:>8} {per_poi:>8.0f} {per_visit:>8.0f} {total / 1e6:>10.2f}  "
+              + ', '.join(f"{name} {row['bytes'] / 1e6:.2f}MB" for name, row in largest))
+        rows.append((n, per_poi, per_visit))
+
+    if plot:
+        try:
+            import matplotlib
+            matplotlib.use('Agg')
+            import matplotlib.pyplot as plt
+        except ImportError:
+            print("matplotlib is not installed; skipping the plot")
+            return
+        plt.plot([r[0] for r in rows], [r[1] for r in rows], marker='o', label='bytes per POI')
+        plt.plot([r[0] for r in rows], [r[2] for r in rows], marker='o', label='bytes per visit')
+        plt.xscale('log')
+        plt.xlabel('POIs')
+        plt.ylabel('bytes')
+        plt.legend()
+        plt.savefig(plot)
+        print(f"plot written to {plot}")
+
+
+if __name__ == "__main__":
+    main()
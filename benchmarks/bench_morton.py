@@ -0,0 +1,81 @@
+"""Morton-sorted store vs. the dict scan and the bucket grid for range queries.
+
+The store keeps (code, id, x, y) in parallel arrays sorted by Z-order code,
+about 24 bytes per POI. A rectangle is answered by a handful of contiguous
+range scans over those arrays, so a query touches roughly the POIs near the
+rectangle instead of every POI. That beats the dict scan behind
+find_poi_in_radius by a wide margin, but not the bucket grid, which is why
+find_poi_in_rect keeps using the grid and only radius queries go through
+the store. Inserts land in a buffer that is merged in O(n) once
+buffer_size rows accumulate, so bulk loads pay one merge per buffer_size
+inserts.
+
+Usage: python benchmarks/bench_morton.py [poi_count] [buffer_size]
+"""
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'modules'))
+
+from models import POIManager
+
+
+def timed(fn, repeat=1):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - start) / repeat
+
+
+def main():
+    poi_count = int(sys.argv[1]) if len(sys.argv) > 1 else 50000
+    buffer_size = int(sys.argv[2]) if len(sys.argv) > 2 else 256
+    rng = random.Random(42)
+
+    manager = POIManager()
+    manager.add_poi_type("bench")
+    for i in range(poi_count):
+        manager.add_poi(f"POI {i}", "bench", rng.randrange(manager.map_size), rng.randrange(manager.map_size))
+
+    def dict_rect(x0, y0, x1, y1):
+        return manager._region_results(poi for poi in manager.pois.values()
+                                       if x0 <= poi.x <= x1 and y0 <= poi.y <= y1)
+
+    print(f"pois={poi_count} buffer_size={buffer_size}")
+    print(f"{'query':<16} {'dict scan':>12} {'grid':>12} {'morton':>12}   (us/query)")
+    for side in (20, 100, 400):
+        rects = []
+        for _ in range(50):
+            x0, y0 = rng.randrange(manager.map_size - side), rng.randrange(manager.map_size - side)
+            rects.append((x0, y0, x0 + side, y0 + side))
+        scan = timed(lambda: [dict_rect(*r) for r in rects]) / len(rects)
+        grid = timed(lambda: [manager.find_poi_in_rect(*r) for r in rects]) / len(rects)
+        store = manager.enable_morton_store(buffer_size)
+        morton = timed(lambda: [manager._region_results(manager.pois[poi_id] for poi_id, _, _ in store.query_rect(*r))
+                                for r in rects]) / len(rects)
+        print(f"rect {side}x{side:<9} {scan * 1e6:>12.0f} {grid * 1e6:>12.0f} {morton * 1e6:>12.0f}")
+
+    for radius in (10, 50, 200):
+        circles = [(rng.randrange(manager.map_size), rng.randrange(manager.map_size)) for _ in range(50)]
+        manager.disable_morton_store()
+        scan = timed(lambda: [manager.find_poi_in_radius(x, y, radius) for x, y in circles]) / len(circles)
+        manager.enable_morton_store(buffer_size)
+        morton = timed(lambda: [manager.find_poi_in_radius(x, y, radius) for x, y in circles]) / len(circles)
+        print(f"radius {radius:<9} {scan * 1e6:>12.0f} {'-':>12} {morton * 1e6:>12.0f}")
+
+    build = timed(lambda: manager.enable_morton_store(buffer_size))
+    inserts = 2000
+    start = time.perf_counter()
+    for i in range(inserts):
+        manager.add_poi(f"New {i}", "bench", rng.randrange(manager.map_size), rng.randrange(manager.map_size))
+    insert = (time.perf_counter() - start) / inserts
+    store = manager._morton
+    print(f"store build:          {build * 1e3:.1f} ms")
+    print(f"add_poi with store:   {insert * 1e6:.1f} us/insert (merge every {buffer_size})")
+    print(f"store arrays:         {sum(a.itemsize * len(a) for a in (store.codes, store.ids, store.xs, store.ys)) / 2**20:.2f} MiB")
+
+
+if __name__ == "__main__":
+    main()
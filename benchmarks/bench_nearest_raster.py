@@ -0,0 +1,67 @@
+"""Nearest-POI raster vs. linear scan for find_k_closest_poi(x, y, 1).
+
+Trade-off: the raster costs 4 bytes per map cell regardless of the number of
+POIs (map_size=1000 -> ~4 MB) plus a build of roughly O(map_size^2) in pure
+Python. In exchange a 1-NN query becomes one array lookup instead of an O(n)
+scan. add_poi only rewrites the cells the new POI wins and delete_poi only
+refills the cells the removed POI owned, so update cost follows the size of
+that POI's Voronoi region: cheap on dense maps, close to a rebuild when a lone
+POI owns most of the map.
+
+Usage: python benchmarks/bench_nearest_raster.py [map_size] [poi_count]
+"""
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'modules'))
+
+from models import POIManager
+
+
+def timed(fn, repeat=1):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - start) / repeat
+
+
+def main():
+    map_size = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    poi_count = int(sys.argv[2]) if len(sys.argv) > 2 else 5000
+    rng = random.Random(42)
+
+    manager = POIManager()
+    manager.map_size = map_size
+    manager.add_poi_type("bench")
+    for i in range(poi_count):
+        manager.add_poi(f"POI {i}", "bench", rng.randrange(map_size), rng.randrange(map_size))
+
+    queries = [(rng.randrange(map_size), rng.randrange(map_size)) for _ in range(200)]
+
+    def run_queries():
+        for x, y in queries:
+            manager.find_k_closest_poi(x, y, 1)
+
+    scan = timed(run_queries) / len(queries)
+    build = timed(manager.enable_nearest_raster)
+    lookup = timed(run_queries, repeat=5) / len(queries)
+    raster_bytes = manager._nearest.owner.buffer_info()[1] * manager._nearest.owner.itemsize
+
+    def churn():
+        manager.add_poi("churn", "bench", rng.randrange(map_size), rng.randrange(map_size))
+        manager.delete_poi(next(reversed(manager.pois)))
+
+    update = timed(churn, repeat=20)
+
+    print(f"map_size={map_size} pois={poi_count}")
+    print(f"raster memory:        {raster_bytes / 2**20:.2f} MiB")
+    print(f"raster build:         {build * 1e3:.1f} ms")
+    print(f"1-NN linear scan:     {scan * 1e6:.1f} us/query")
+    print(f"1-NN raster lookup:   {lookup * 1e6:.1f} us/query")
+    print(f"add+delete update:    {update * 1e3:.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -309,14 +309,19 @@ def show_visitor_history(manager):
     print("\n--- Visitor visit history ---")
     try:
         visitor_id = int(input("Enter visitor ID: ").strip())
-        history = manager.get_visitor_history(visitor_id)
-        if history:
-            for visit in history:
-                poi = manager.pois.get(visit.poi_id)
-                poi_name = poi.name if poi else "UNKNOWN"
-                print(f"Date: {visit.date}, POI: {visit.poi_id} ({poi_name})")
-        else:
+        result = manager.get_visitor_history_page(visitor_id, limit=20)
+        if not result or not result[0]:
             print("No visit history found.")
+            return
+        while True:
+            page, cursor = result
+            for visit, poi_name in page:
+                print(f"Date: {visit.date}, POI: {visit.poi_id} ({poi_name or 'UNKNOWN'})")
+            if cursor is None:
+                break
+            if input("Press Enter for more, or q to stop: ").strip().lower() == 'q':
+                break
+            result = manager.get_visitor_history_page(visitor_id, cursor, limit=20)
     except ValueError:
         print("Error: ID must be a number.")
 
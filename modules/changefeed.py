@@ -0,0 +1,141 @@
+import queue
+import threading
+from collections import deque
+from typing import Deque, Iterable, List, Optional, Set
+
+
+class ChangeEvent:
+    __slots__ = ('seq', 'kind', 'data')
+
+    def __init__(self, seq: int, kind: str, data: dict):
+        self.seq = seq
+        self.kind = kind
+        self.data = data
+
+    def __repr__(self):
+        return f"ChangeEvent(seq={self.seq}, kind='{self.kind}', data={self.data})"
+
+
+class Subscription:
+    """A consumer's bounded queue of event batches"""
+
+    def __init__(self, feed: "ChangeFeed", kinds: Optional[Set[str]], maxsize: int):
+        self.feed = feed
+        self.kinds = kinds
+        self.last_seq = 0
+        self.lagged = False
+        self._queue: "queue.Queue[List[ChangeEvent]]" = queue.Queue(maxsize)
+        self._backlog: Deque[List[ChangeEvent]] = deque()
+
+    def wants(self, event: ChangeEvent) -> bool:
+        return self.kinds is None or event.kind in self.kinds
+
+    def poll(self, timeout: Optional[float] = 0) -> Optional[List[ChangeEvent]]:
+        """Next batch of events, or None if nothing arrives within timeout (None = wait forever)"""
+        if self._backlog:
+            batch = self._backlog.popleft()
+        else:
+            try:
+                batch = self._queue.get_nowait()
+            except queue.Empty:
+                # Deliver whatever the producer has buffered, then wait
+                self.feed.flush(blocking=False)
+                try:
+                    batch = self._queue.get(block=timeout != 0, timeout=timeout or None)
+                except queue.Empty:
+                    return None
+        self.last_seq = batch[-1].seq
+        return batch
+
+    def close(self):
+        self.feed.unsubscribe(self)
+
+
+class ChangeFeed:
+    """Sequenced mutation events, delivered to subscribers in batches.
+
+    Events are buffered until batch_size accumulate (or flush() is called) and
+    then pushed to each interested subscriber's bounded queue. By default
+    (put_timeout=0) the producer never waits: a subscriber whose queue is full
+    is dropped and marked lagged. A positive put_timeout waits that long first,
+    and None blocks until the consumer drains (backpressure), which is only
+    safe when the consumer polls from another thread.
+
+    Only the last `retention` events are kept for replay, none by default; with
+    no subscribers and no retention, publishing just bumps the sequence number.
+    A lagged subscriber can catch up with replay(last_seq + 1) while the events
+    it missed are still retained.
+    """
+
+    def __init__(self, batch_size: int = 100, retention: int = 0, put_timeout: Optional[float] = 0):
+        if batch_size < 1:
+            raise ValueError("batch_size must be >= 1")
+        self.batch_size = batch_size
+        self.put_timeout = put_timeout
+        self.seq = 0
+        self._log: Deque[ChangeEvent] = deque(maxlen=retention)
+        self._pending: List[ChangeEvent] = []
+        self._subscribers: List[Subscription] = []
+        self._lock = threading.RLock()
+
+    def publish(self, kind: str, **data) -> int:
+        with self._lock:
+            self.seq += 1
+            if not self._subscribers and not self._log.maxlen:
+                return self.seq
+            event = ChangeEvent(self.seq, kind, data)
+            if self._log.maxlen:
+                self._log.append(event)
+            if self._subscribers:
+                self._pending.append(event)
+                if len(self._pending) >= self.batch_size:
+                    self.flush()
+            return self.seq
+
+    def flush(self, blocking: bool = True):
+        if not self._lock.acquire(blocking=blocking):
+            return
+        try:
+            pending, self._pending = self._pending, []
+            if not pending:
+                return
+            for sub in list(self._subscribers):
+                batch = [event for event in pending if sub.wants(event)]
+                if not batch:
+                    continue
+                try:
+                    sub._queue.put(batch, block=self.put_timeout != 0, timeout=self.put_timeout or None)
+                except queue.Full:
+                    sub.lagged = True
+                    self._subscribers.remove(sub)
+        finally:
+            self._lock.release()
+
+    def replay(self, from_seq: int, kinds: Optional[Iterable[str]] = None) -> List[ChangeEvent]:
+        """Retained events with seq >= from_seq"""
+        kinds = set(kinds) if kinds is not None else None
+        with self._lock:
+            first = self._log[0].seq if self._log else self.seq + 1
+            if from_seq < first:
+                raise ValueError(f"events before seq {first} are not retained")
+            return [event for event in self._log
+                    if event.seq >= from_seq and (kinds is None or event.kind in kinds)]
+
+    def subscribe(self, kinds: Optional[Iterable[str]] = None, from_seq: Optional[int] = None,
+                  maxsize: int = 64) -> Subscription:
+        """Register for events of the given kinds (all if None), optionally replaying from a seq"""
+        sub = Subscription(self, set(kinds) if kinds is not None else None, maxsize)
+        with self._lock:
+            # Hand out buffered events first so replay and live delivery do not overlap
+            self.flush()
+            if from_seq is not None:
+                history = self.replay(from_seq, sub.kinds)
+                for start in range(0, len(history), self.batch_size):
+                    sub._backlog.append(history[start:start + self.batch_size])
+            self._subscribers.append(sub)
+        return sub
+
+    def unsubscribe(self, sub: Subscription):
+        with self._lock:
+            if sub in self._subscribers:
+                self._subscribers.remove(sub)
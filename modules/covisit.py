@@ -0,0 +1,58 @@
+from collections import deque
+from itertools import islice
+from typing import Deque, Dict, Iterable, List, Set, Tuple
+
+
+class CoVisitationIndex:
+    """Sparse POI x POI matrix: how many visitors visited both POIs.
+
+    Each visitor contributes a pair once, when it visits a POI for the first
+    time. The new POI is paired only with the visitor's `history_cap` most
+    recent distinct POIs, which bounds the update cost for very long histories.
+    """
+
+    def __init__(self, history_cap: int = 50):
+        if history_cap < 1:
+            raise ValueError("history_cap must be >= 1")
+        self.history_cap = history_cap
+        self.counts: Dict[int, Dict[int, int]] = {}
+        self._seen: Dict[int, Set[int]] = {}
+        self._recent: Dict[int, Deque[int]] = {}
+
+    def record(self, visitor_id: int, poi_id: int):
+        seen = self._seen.setdefault(visitor_id, set())
+        if poi_id in seen:
+            return
+        seen.add(poi_id)
+        recent = self._recent.get(visitor_id)
+        if recent is None:
+            recent = self._recent[visitor_id] = deque(maxlen=self.history_cap)
+        row = self.counts.setdefault(poi_id, {})
+        for other in recent:
+            row[other] = row.get(other, 0) + 1
+            other_row = self.counts.setdefault(other, {})
+            other_row[poi_id] = other_row.get(poi_id, 0) + 1
+        recent.append(poi_id)
+
+    def build(self, visitors: Iterable, chunk_size: int = 1000) -> int:
+        """Rebuild from visitor histories, chunk_size visitors at a time; returns chunk count"""
+        self.counts = {}
+        self._seen = {}
+        self._recent = {}
+        visitors = iter(visitors)
+        chunks = 0
+        while True:
+            chunk = list(islice(visitors, chunk_size))
+            if not chunk:
+                return chunks
+            for visitor in chunk:
+                # Same order as the incremental record() calls, so the capped
+                # history window (and so the counts) match
+                for visit in visitor.visits_in_insertion_order():
+                    self.record(visitor.id, visit.poi_id)
+            chunks += 1
+
+    def top_k(self, poi_id: int, k: int) -> List[Tuple[int, int]]:
+        """(other_poi_id, count) pairs, most co-visited first, ties by id"""
+        row = self.counts.get(poi_id, {})
+        return sorted(row.items(), key=lambda item: (-item[1], item[0]))[:max(k, 0)]
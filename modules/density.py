@@ -0,0 +1,98 @@
+from array import array
+from typing import Dict, List, Optional
+
+
+class DensityRaster:
+    """POI counts on a cell grid with 2-D Fenwick trees for rectangle counts.
+
+    An add/remove and a rectangle count both cost O(log² cells), so mixed
+    read/write workloads never rebuild anything. Each tracked type (plus the
+    all-types total) keeps a flat int32 tree and a flat int32 count grid:
+    8 bytes per cell, about 8 MB per type at cell_size=1 on a 1000x1000 map.
+    """
+
+    def __init__(self, map_size: int, cell_size: int = 1):
+        if cell_size < 1:
+            raise ValueError("cell_size must be >= 1")
+        self.map_size = map_size
+        self.cell_size = cell_size
+        self.cells = (map_size + cell_size - 1) // cell_size
+        self._counts: Dict[Optional[str], array] = {}
+        self._trees: Dict[Optional[str], array] = {}
+
+    def _update(self, key: Optional[str], cx: int, cy: int, delta: int):
+        n = self.cells
+        if key not in self._counts:
+            self._counts[key] = array('i', [0]) * (n * n)
+            self._trees[key] = array('i', [0]) * ((n + 1) * (n + 1))
+        self._counts[key][cy * n + cx] += delta
+        tree = self._trees[key]
+        j = cy + 1
+        while j <= n:
+            i = cx + 1
+            row = j * (n + 1)
+            while i <= n:
+                tree[row + i] += delta
+                i += i & -i
+            j += j & -j
+
+    def _prefix(self, tree: array, cx: int, cy: int) -> int:
+        #Sum of cells [0, cx) x [0, cy)
+        stride = self.cells + 1
+        total = 0
+        j = cy
+        while j > 0:
+            i = cx
+            row = j * stride
+            while i > 0:
+                total += tree[row + i]
+                i -= i & -i
+            j -= j & -j
+        return total
+
+    def add(self, poi):
+        cx, cy = poi.x // self.cell_size, poi.y // self.cell_size
+        self._update(None, cx, cy, 1)
+        self._update(poi.type.name, cx, cy, 1)
+
+    def remove(self, poi):
+        cx, cy = poi.x // self.cell_size, poi.y // self.cell_size
+        self._update(None, cx, cy, -1)
+        self._update(poi.type.name, cx, cy, -1)
+
+    def rename_type(self, old: str, new: str):
+        if old in self._counts:
+            self._counts[new] = self._counts.pop(old)
+            self._trees[new] = self._trees.pop(old)
+
+    def is_aligned(self, x_min: int, y_min: int, x_max: int, y_max: int) -> bool:
+        """True if the clipped rectangle covers whole cells, so count_in_rect is exact"""
+        s = self.cell_size
+        x_min, y_min = max(x_min, 0), max(y_min, 0)
+        x_max, y_max = min(x_max, self.map_size - 1), min(y_max, self.map_size - 1)
+        return (x_min % s == 0 and y_min % s == 0 and
+                ((x_max + 1) % s == 0 or x_max == self.map_size - 1) and
+                ((y_max + 1) % s == 0 or y_max == self.map_size - 1))
+
+    def count_in_rect(self, x_min: int, y_min: int, x_max: int, y_max: int,
+                      type_name: Optional[str] = None) -> int:
+        """Number of POIs in the inclusive rectangle (snapped outwards to whole cells)"""
+        x_min, y_min = max(x_min, 0), max(y_min, 0)
+        x_max, y_max = min(x_max, self.map_size - 1), min(y_max, self.map_size - 1)
+        if x_min > x_max or y_min > y_max:
+            return 0
+        tree = self._trees.get(type_name)
+        if tree is None:
+            return 0
+        c0, r0 = x_min // self.cell_size, y_min // self.cell_size
+        c1, r1 = x_max // self.cell_size + 1, y_max // self.cell_size + 1
+        return (self._prefix(tree, c1, r1) - self._prefix(tree, c1, r0)
+                - self._prefix(tree, c0, r1) + self._prefix(tree, c0, r0))
+
+    def heatmap(self, type_name: Optional[str] = None) -> List[List[int]]:
+        """Copy of the cell counts as rows (y) of columns (x)"""
+        n = self.cells
+        counts = self._counts.get(type_name)
+        if counts is None:
+            return [[0] * n for _ in range(n)]
+        return [counts[row * n:(row + 1) * n].tolist() for row in range(n)]
@@ -0,0 +1,171 @@
+import csv
+import json
+from typing import IO, Iterator, List, Optional, Set, Tuple
+
+import yaml
+
+Region = Tuple[int, int, int, int]
+
+
+class Snapshot:
+    """Point-in-time view of a POIManager for exporting.
+
+    Only containers are copied (references to POIs, each visitor's visit list),
+    which is quick and needs no lock on the manager. POIs and visits added,
+    deleted or moved afterwards are not exported; records are built lazily, so
+    in-place edits of a POI's name or attributes during the export may show up.
+    """
+
+    def __init__(self, manager, types: Optional[Set[str]] = None, region: Optional[Region] = None):
+        self.seq = manager.change_seq
+        self.types = [(name, list(poi_type.attributes)) for name, poi_type in manager.poi_types.items()
+                      if types is None or name in types]
+        pois = list(manager.pois.values())
+        if types is not None:
+            pois = [poi for poi in pois if poi.type.name in types]
+        if region is not None:
+            inside = {row[0] for row in manager.find_poi_in_rect(*region)}
+            pois = [poi for poi in pois if poi.id in inside]
+        self.pois = pois
+        filtered = types is not None or region is not None
+        poi_ids = {poi.id for poi in pois}
+        self.visitors = []
+        for visitor in list(manager.visitors.values()):
+            visits = [visit for visit in visitor.visits if visit.poi_id in poi_ids] if filtered else list(visitor.visits)
+            if visits or not filtered:
+                self.visitors.append((visitor.id, visitor.name, visitor.nationality, visits))
+
+
+def _chunks(items: List, chunk_size: int) -> Iterator[List]:
+    for start in range(0, len(items), chunk_size):
+        yield items[start:start + chunk_size]
+
+
+def poi_record(poi) -> dict:
+    #Same flat layout load_config reads
+    record = {'id': poi.id, 'name': poi.name, 'type': poi.type.name, 'x': poi.x, 'y': poi.y}
+    for attr, value in poi.attributes.items():
+        if value is not None:
+            record.setdefault(attr, value)
+    return record
+
+
+def visit_record(visit) -> dict:
+    record = {'poi_id': visit.poi_id, 'date': visit.date}
+    if visit.rating is not None:
+        record['rating'] = visit.rating
+    return record
+
+
+def iter_type_chunks(snapshot: Snapshot, chunk_size: int) -> Iterator[List[dict]]:
+    for chunk in _chunks(snapshot.types, chunk_size):
+        yield [{'name': name, 'attributes': attrs} for name, attrs in chunk]
+
+
+def iter_poi_chunks(snapshot: Snapshot, chunk_size: int) -> Iterator[List[dict]]:
+    for chunk in _chunks(snapshot.pois, chunk_size):
+        yield [poi_record(poi) for poi in chunk]
+
+
+def iter_visitor_chunks(snapshot: Snapshot, chunk_size: int, with_visits: bool = True) -> Iterator[List[dict]]:
+    for chunk in _chunks(snapshot.visitors, chunk_size):
+        records = []
+        for visitor_id, name, nationality, visits in chunk:
+            record = {'id': visitor_id, 'name': name, 'nationality': nationality}
+            if with_visits:
+                record['visits'] = [visit_record(visit) for visit in visits]
+            records.append(record)
+        yield records
+
+
+def iter_visit_chunks(snapshot: Snapshot, chunk_size: int) -> Iterator[List[dict]]:
+    chunk = []
+    for visitor_id, _, _, visits in snapshot.visitors:
+        for visit in visits:
+            record = visit_record(visit)
+            record['visitor_id'] = visitor_id
+            chunk.append(record)
+            if len(chunk) >= chunk_size:
+                yield chunk
+                chunk = []
+    if chunk:
+        yield chunk
+
+
+def _indented(text: str) -> str:
+    return ''.join('  ' + line for line in text.splitlines(True))
+
+
+def export_yaml(snapshot: Snapshot, fp: IO[str], chunk_size: int = 1000) -> int:
+    """Write a config load_config can read back; returns the number of records"""
+    count = 0
+
+    fp.write('poi_types:' + ('\n' if snapshot.types else ' {}\n'))
+    for chunk in iter_type_chunks(snapshot, chunk_size):
+        body = {record['name']: record['attributes'] for record in chunk}
+        fp.write(_indented(yaml.safe_dump(body, sort_keys=False, allow_unicode=True, default_flow_style=None)))
+        count += len(chunk)
+
+    for section, chunks in (('pois', iter_poi_chunks(snapshot, chunk_size)),
+                            ('visitors', iter_visitor_chunks(snapshot, chunk_size))):
+        wrote_header = False
+        for chunk in chunks:
+            if not wrote_header:
+                fp.write(f'{section}:\n')
+                wrote_header = True
+            fp.write(_indented(yaml.safe_dump(chunk, sort_keys=False, allow_unicode=True)))
+            count += len(chunk)
+        if not wrote_header:
+            fp.write(f'{section}: []\n')
+    return count
+
+
+def export_jsonl(snapshot: Snapshot, fp: IO[str], chunk_size: int = 1000) -> int:
+    """One JSON object per line, tagged with its kind; visits are separate records"""
+    count = 0
+    sections = (('poi_type', iter_type_chunks(snapshot, chunk_size)),
+                ('poi', iter_poi_chunks(snapshot, chunk_size)),
+                ('visitor', iter_visitor_chunks(snapshot, chunk_size, with_visits=False)),
+                ('visit', iter_visit_chunks(snapshot, chunk_size)))
+    for kind, chunks in sections:
+        for chunk in chunks:
+            fp.write(''.join(json.dumps(dict(record, kind=kind), default=str) + '\n' for record in chunk))
+            count += len(chunk)
+    return count
+
+
+def export_csv(snapshot: Snapshot, fp: IO[str], entity: str = 'pois', chunk_size: int = 1000) -> int:
+    """One table per call: entity is 'poi_types', 'pois', 'visitors' or 'visits'"""
+    if entity == 'pois':
+        attributes = []
+        for _, attrs in snapshot.types:
+            attributes.extend(attr for attr in attrs if attr not in attributes)
+        fields = ['id', 'name', 'type', 'x', 'y'] + [a for a in attributes if a not in ('id', 'name', 'type', 'x', 'y')]
+        chunks = iter_poi_chunks(snapshot, chunk_size)
+    elif entity == 'visitors':
+        fields = ['id', 'name', 'nationality']
+        chunks = iter_visitor_chunks(snapshot, chunk_size, with_visits=False)
+    elif entity == 'visits':
+        fields = ['visitor_id', 'poi_id', 'date', 'rating']
+        chunks = iter_visit_chunks(snapshot, chunk_size)
+    elif entity == 'poi_types':
+        fields = ['name', 'attributes']
+        chunks = iter_type_chunks(snapshot, chunk_size)
+    else:
+        raise ValueError(f"Unknown entity '{entity}'")
+
+    writer = csv.DictWriter(fp, fieldnames=fields, extrasaction='ignore')
+    writer.writeheader()
+    count = 0
+    for chunk in chunks:
+        writer.writerows({key: json.dumps(value) if isinstance(value, (list, dict)) else value
+                          for key, value in record.items()} for record in chunk)
+        count += len(chunk)
+    return count
+
+
+EXPORTERS = {
+    'yaml': export_yaml,
+    'jsonl': export_jsonl,
+    'csv': export_csv,
+}
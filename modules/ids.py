@@ -0,0 +1,61 @@
+from typing import List, Set
+
+
+class IdAllocator:
+    """Per-manager id source with O(1) allocation.
+
+    Ids come from a counter. Explicitly requested ids at or above the counter
+    are remembered in a small set and skipped when the counter reaches them,
+    so nothing is scanned. Released ids are recycled only when reuse=True.
+    """
+
+    def __init__(self, start: int = 1, reuse: bool = False):
+        self.reuse = reuse
+        self._next = start
+        self._claimed_ahead: Set[int] = set()
+        self._free: List[int] = []
+        self._free_set: Set[int] = set()
+
+    @property
+    def next_id(self) -> int:
+        return self._next
+
+    def allocate(self) -> int:
+        while self._free:
+            candidate = self._free.pop()
+            if candidate in self._free_set:
+                self._free_set.discard(candidate)
+                return candidate
+        # each claimed id is skipped at most once, so this is amortised O(1)
+        while self._next in self._claimed_ahead:
+            self._claimed_ahead.discard(self._next)
+            self._next += 1
+        allocated = self._next
+        self._next += 1
+        return allocated
+
+    def reserve(self, count: int) -> range:
+        """Hand out a contiguous block of fresh ids for a bulk load"""
+        start = self._next
+        while True:
+            clash = [i for i in self._claimed_ahead if start <= i < start + count]
+            if not clash:
+                break
+            start = max(clash) + 1
+        self._next = start + count
+        self._claimed_ahead = {i for i in self._claimed_ahead if i >= self._next}
+        return range(start, start + count)
+
+    def claim(self, requested: int) -> bool:
+        """Mark an explicit id as taken; the caller checks it is not in use"""
+        if requested < 1:
+            return False
+        if requested >= self._next:
+            self._claimed_ahead.add(requested)
+        self._free_set.discard(requested)
+        return True
+
+    def release(self, released: int):
+        if self.reuse and released not in self._free_set:
+            self._free.append(released)
+            self._free_set.add(released)
@@ -0,0 +1,112 @@
+import random
+import sys
+import types
+from array import array
+from collections import deque
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+# Leaves: sys.getsizeof already covers their whole payload
+_ATOMIC = (str, bytes, bytearray, int, float, complex, bool, type(None), array, range)
+# Shared program objects that never belong to one structure
+_SKIP = (type, types.ModuleType, types.FunctionType, types.BuiltinFunctionType, types.MethodType)
+
+
+def deep_sizeof(obj, seen: Set[int]) -> Tuple[int, int]:
+    """(bytes, objects) reachable from obj, skipping anything already in seen"""
+    size = 0
+    count = 0
+    stack = [obj]
+    while stack:
+        current = stack.pop()
+        if id(current) in seen or isinstance(current, _SKIP):
+            continue
+        seen.add(id(current))
+        size += sys.getsizeof(current)
+        count += 1
+        if isinstance(current, _ATOMIC):
+            continue
+        if isinstance(current, dict):
+            stack.extend(current.keys())
+            stack.extend(current.values())
+        elif isinstance(current, (list, tuple, set, frozenset, deque)):
+            stack.extend(current)
+        else:
+            if hasattr(current, '__dict__'):
+                stack.append(current.__dict__)
+            for cls in type(current).__mro__:
+                for slot in getattr(cls, '__slots__', ()):
+                    if hasattr(current, slot):
+                        stack.append(getattr(current, slot))
+    return size, count
+
+
+def _measure(parts: Iterable, seen: Set[int]) -> Tuple[int, int]:
+    size = count = 0
+    for part in parts:
+        part_size, part_count = deep_sizeof(part, seen)
+        size += part_size
+        count += part_count
+    return size, count
+
+
+def _measure_items(items: List, seen: Set[int], sample: Optional[int], seed: int,
+                   container=None) -> Tuple[int, int]:
+    #Each item is a tuple of parts sized together (the tuple itself is not charged).
+    #With sample, size that many items and extrapolate to the rest
+    size = count = 0
+    if container is not None:
+        size, count = sys.getsizeof(container), 1
+        seen.add(id(container))
+    if sample is None or len(items) <= sample:
+        picked = items
+    else:
+        # Same seed and length -> same picks, so a POI's parts and the POI line up
+        picked = random.Random(seed).sample(items, sample)
+    item_size, item_count = _measure((part for item in picked for part in item), seen)
+    if picked is items:
+        return size + item_size, count + item_count
+    # Unsampled items are already paid for by the estimate; keep later structures off them
+    seen.update(id(part) for item in items for part in item)
+    scale = len(items) / sample
+    return size + int(item_size * scale), count + int(item_count * scale)
+
+
+def memory_report(manager, sample: Optional[int] = None, seed: int = 0) -> Dict[str, Dict[str, int]]:
+    """Per-structure {'bytes', 'objects'} of a POIManager.
+
+    Every object is charged to the first structure below that reaches it, so
+    nothing is counted twice. With sample=N the per-POI and per-visitor parts
+    size N random items and scale up, which bounds the cost on large managers.
+    """
+    if sample is not None and sample < 1:
+        raise ValueError("sample must be >= 1")
+    seen: Set[int] = {id(manager)}
+    report = {}
+
+    def add(name: str, measured: Tuple[int, int]):
+        report[name] = {'bytes': measured[0], 'objects': measured[1]}
+
+    pois = list(manager.pois.values())
+    visitors = list(manager.visitors.values())
+
+    add('poi_types', _measure([manager.poi_types], seen))
+    # Sparse attribute storage is charged before the POIs that own it
+    add('poi_attributes', _measure_items([(poi._values, poi._extra) for poi in pois], seen, sample, seed))
+    add('pois', _measure_items([(poi,) for poi in pois], seen, sample, seed, container=manager.pois))
+    add('visits', _measure_items([(v.visits, v._visit_keys) for v in visitors], seen, sample, seed))
+    add('visitors', _measure_items([(v,) for v in visitors], seen, sample, seed, container=manager.visitors))
+    add('id_allocators', _measure([manager._poi_ids, manager._visitor_ids], seen))
+    add('spatial_grid', _measure([manager._grid], seen))
+    add('density_raster', _measure([manager._density], seen))
+    add('nearest_raster', _measure([manager._nearest], seen))
+    add('morton_store', _measure([manager._morton], seen))
+    add('cardinality_sketches', _measure([manager._poi_visitor_sketches, manager._visitor_poi_sketches], seen))
+    add('covisitation_index', _measure([manager._covisits], seen))
+    add('nationality_index', _measure([manager._visitors_by_nationality, manager._nationality_stats], seen))
+    add('change_feed', _measure([manager._changes], seen))
+    add('config_tracking', _measure([manager._config_types, manager._config_pois,
+                                     manager._config_visitors, manager._config_visits], seen))
+
+    report['total'] = {'bytes': sum(r['bytes'] for r in report.values()),
+                       'objects': sum(r['objects'] for r in report.values())}
+    return report
@@ -1,39 +1,207 @@
 import math
 import yaml
-from collections import defaultdict
+from bisect import bisect_right
+from collections import Counter, defaultdict
 from typing import Dict, Optional 
+from changefeed import ChangeFeed, Subscription
+from covisit import CoVisitationIndex
+from density import DensityRaster
+from export import EXPORTERS, Snapshot
+from ids import IdAllocator
+from memory import memory_report
+from morton import MortonStore
+from sketches import HyperLogLog
+from voronoi import NearestRaster
+from spatial import SpatialGrid, connected_components, pairs_within, polygon_candidates
 
 class POIType:
     def __init__(self, name: str):
         self.name = name
         self.attributes = []
+        # Schema metadata: attribute name -> storage slot. POIs keep values by
+        # slot, so renaming or dropping an attribute never touches the POIs.
+        self.version = 0
+        self._slots: Dict[str, int] = {}
+        self._live_slots = set()
+        self._next_slot = 0
+        # (version, old, new) for removals (new is None) and renames, so POIs can
+        # catch up values kept outside the slots when they next sync
+        self._history = []
     
     def __repr__(self):
         return f"POIType(name='{self.name}', attributes={self.attributes})"
 
-class POI:
-    _id_counter = 1
-    _used_ids = set()
-    
-    def __init__(self, name: str, poi_type, x: int, y: int, attributes: Optional[Dict] = None):
+    def _schema_changed(self):
+        self.version += 1
+        self._live_slots = set(self._slots.values())
 
-        while POI._id_counter in POI._used_ids:
-            POI._id_counter += 1
-        
-        self.id = POI._id_counter
-        POI._used_ids.add(self.id)
-        POI._id_counter += 1
-        
+    def slot_for(self, attribute_name: str) -> int:
+        #Slot of a schema attribute, allocated on first use
+        slot = self._slots.get(attribute_name)
+        if slot is None:
+            slot = self._slots[attribute_name] = self._next_slot
+            self._next_slot += 1
+            self._schema_changed()
+        return slot
+
+    def add_attribute(self, attribute_name: str) -> bool:
+        if attribute_name in self.attributes:
+            return False
+        self.attributes.append(attribute_name)
+        # Fresh slot: values left behind by an earlier attribute of this name stay hidden
+        self._slots.pop(attribute_name, None)
+        self.slot_for(attribute_name)
+        return True
+
+    def remove_attribute(self, attribute_name: str) -> bool:
+        if attribute_name not in self.attributes:
+            return False
+        self.attributes.remove(attribute_name)
+        self._slots.pop(attribute_name, None)
+        self._schema_changed()
+        self._history.append((self.version, attribute_name, None))
+        return True
+
+    def rename_attribute(self, old: str, new: str) -> bool:
+        if old not in self.attributes or new in self.attributes:
+            return False
+        self.attributes[self.attributes.index(old)] = new
+        slot = self._slots.pop(old, None)
+        if slot is not None:
+            self._slots[new] = slot
+        self._schema_changed()
+        self._history.append((self.version, old, new))
+        return True
+
+_MISSING = object()
+
+class POIAttributes(dict):
+    """A POI's attributes as a plain dict, resolved against its type's schema.
+
+    Schema attributes without a stored value read as None; keys outside the
+    schema are kept per POI as before. The dict is a snapshot taken when
+    poi.attributes is read; writes through it also update the POI.
+    """
+
+    def __init__(self, poi):
+        poi._sync_schema()
+        super().__init__(poi._resolved_attributes())
+        self._poi = poi
+
+    def __setitem__(self, key, value):
+        poi = self._poi
+        if key in poi.type.attributes:
+            slot = poi.type.slot_for(key)
+            poi._extra.pop(key, None)
+            if value is None:
+                poi._values.pop(slot, None)
+            else:
+                poi._values[slot] = value
+        else:
+            poi._extra[key] = value
+        super().__setitem__(key, value)
+
+    def __delitem__(self, key):
+        poi = self._poi
+        if key in poi.type.attributes:
+            # Schema attributes always exist; deleting resets to the default
+            poi._values.pop(poi.type._slots.get(key), None)
+            poi._extra.pop(key, None)
+            super().__setitem__(key, None)
+        else:
+            del poi._extra[key]
+            super().__delitem__(key)
+
+    def update(self, *args, **kwargs):
+        for key, value in dict(*args, **kwargs).items():
+            self[key] = value
+
+    def __ior__(self, other):
+        self.update(other)
+        return self
+
+    def setdefault(self, key, default=None):
+        if key not in self:
+            self[key] = default
+        return self[key]
+
+    def pop(self, key, default=_MISSING):
+        if key not in self:
+            if default is _MISSING:
+                raise KeyError(key)
+            return default
+        value = self[key]
+        del self[key]
+        return value
+
+    def popitem(self):
+        key = next(reversed(self))
+        return key, self.pop(key)
+
+    def clear(self):
+        for key in list(self):
+            del self[key]
+
+# Fallback for POIs/visitors created outside a POIManager
+_standalone_poi_ids = IdAllocator()
+_standalone_visitor_ids = IdAllocator()
+
+class POI:
+    def __init__(self, name: str, poi_type, x: int, y: int, attributes: Optional[Dict] = None,
+                 poi_id: Optional[int] = None):
+        self.id = poi_id if poi_id is not None else _standalone_poi_ids.allocate()
         self.name = name
         self.type = poi_type
         self.x = x
         self.y = y
-        self.attributes = attributes if attributes else {}
-        
-        # Initialize missing attributes from type
-        for attr in self.type.attributes:
-            if attr not in self.attributes:
-                self.attributes[attr] = None
+        # Sparse storage: only non-default schema values (by slot) and non-schema keys
+        self._values: Dict[int, object] = {}
+        self._extra: Dict[str, object] = {}
+        self._schema_version = poi_type.version
+        if attributes:
+            self.attributes.update(attributes)
+
+    @property
+    def attributes(self) -> POIAttributes:
+        return POIAttributes(self)
+
+    @attributes.setter
+    def attributes(self, values: Dict):
+        self._values.clear()
+        self._extra.clear()
+        self.attributes.update(values)
+
+    def _sync_schema(self):
+        #Lazily apply schema changes made since last access
+        if self._schema_version != self.type.version:
+            live = self.type._live_slots
+            for slot in [s for s in self._values if s not in live]:
+                del self._values[slot]
+            if self._extra:
+                # Values set before their key joined the schema live in _extra
+                history = self.type._history
+                start = len(history)
+                while start and history[start - 1][0] > self._schema_version:
+                    start -= 1
+                for _, old, new in history[start:]:
+                    if new is None:
+                        self._extra.pop(old, None)
+                    elif old in self._extra:
+                        self._extra[new] = self._extra.pop(old)
+                    else:
+                        self._extra.pop(new, None)
+            self._schema_version = self.type.version
+
+    def _resolved_attributes(self) -> Dict:
+        schema = self.type.attributes
+        resolved = {}
+        for attr in schema:
+            slot = self.type._slots.get(attr)
+            resolved[attr] = self._values[slot] if slot in self._values else self._extra.get(attr)
+        for key, value in self._extra.items():
+            if key not in schema:
+                resolved[key] = value
+        return resolved
     
     def __repr__(self):
         return f"POI(id={self.id}, name='{self.name}', type='{self.type.name}', coordinates=({self.x},{self.y}))"
@@ -44,25 +212,88 @@ class Visit:
         self.date = date
         self.rating = rating
 
+class VisitStats:
+    """Running aggregate of the visits one visitor group made to one POI.
+
+    Unique visitors are an exact set, or a HyperLogLog sketch when one is
+    passed in (approximate cardinality mode).
+    """
+    __slots__ = ('visits', 'rating_sum', 'rated', 'visitors')
+
+    def __init__(self, visitors: Optional[HyperLogLog] = None):
+        self.visits = 0
+        self.rating_sum = 0
+        self.rated = 0
+        self.visitors = visitors if visitors is not None else set()
+
+    def add(self, visitor_id: int, rating: Optional[int]):
+        self.visits += 1
+        self.visitors.add(visitor_id)
+        if rating is not None:
+            self.rating_sum += rating
+            self.rated += 1
+
+    @property
+    def unique_visitors(self) -> int:
+        if isinstance(self.visitors, HyperLogLog):
+            return self.visitors.count()
+        return len(self.visitors)
+
+    @property
+    def average_rating(self) -> Optional[float]:
+        return self.rating_sum / self.rated if self.rated else None
+
 class Visitor:
-    _id_counter = 1
-    
-    def __init__(self, name: str, nationality: str):
-        self.id = Visitor._id_counter
-        Visitor._id_counter += 1
+    def __init__(self, name: str, nationality: str, visitor_id: Optional[int] = None):
+        self.id = visitor_id if visitor_id is not None else _standalone_visitor_ids.allocate()
         self.name = name
         self.nationality = nationality
+        # Kept sorted by date: visits[i] has sort key _visit_keys[i] = (day ordinal, insertion seq)
         self.visits = []
+        self._visit_keys = []
+        self._visit_seq = 0
+    
+    def visits_in_insertion_order(self):
+        #Visits in the order add_visit recorded them, undoing the date sort
+        order = sorted(range(len(self.visits)), key=lambda i: self._visit_keys[i][1])
+        return [self.visits[i] for i in order]
     
     def __repr__(self):
         return f"Visitor(id={self.id}, name='{self.name}', nationality='{self.nationality}')"
 
 class POIManager:
-    def __init__(self):
+    def __init__(self, reuse_poi_ids: bool = False, cardinality_mode: str = 'exact',
+                 cardinality_error: float = 0.01, change_batch_size: int = 100,
+                 change_retention: int = 0, change_put_timeout: Optional[float] = 0):
         self.poi_types: Dict[str, POIType] = {}
         self.pois: Dict[int, POI] = {}
         self.visitors: Dict[int, Visitor] = {}
         self.map_size = 1000
+        # Ids are scoped to this manager; deleted POI ids are recycled only on request
+        self._poi_ids = IdAllocator(reuse=reuse_poi_ids)
+        self._visitor_ids = IdAllocator()
+        # 'approximate' keeps HyperLogLog sketches instead of exact visitor/POI sets
+        if cardinality_mode not in ('exact', 'approximate'):
+            raise ValueError("cardinality_mode must be 'exact' or 'approximate'")
+        self.cardinality_mode = cardinality_mode
+        self.cardinality_error = cardinality_error
+        self._poi_visitor_sketches: Dict[int, HyperLogLog] = {}
+        self._visitor_poi_sketches: Dict[int, HyperLogLog] = {}
+        self._covisits: Optional[CoVisitationIndex] = None
+        # Secondary indexes: nationality -> visitor ids, nationality -> poi_id -> VisitStats
+        self._visitors_by_nationality: Dict[str, set] = defaultdict(set)
+        self._nationality_stats: Dict[str, Dict[int, VisitStats]] = defaultdict(dict)
+        self._grid = SpatialGrid()
+        self._density: Optional[DensityRaster] = None
+        self._nearest: Optional[NearestRaster] = None
+        self._morton: Optional[MortonStore] = None
+        # What was last applied from a config file, by stable key, so reload_config can diff
+        self._config_types: Dict[str, list] = {}
+        self._config_pois: Dict[tuple, int] = {}
+        self._config_visitors: Dict[tuple, int] = {}
+        self._config_visits: Dict[int, Counter] = defaultdict(Counter)
+        # Mutation events: no retention and non-blocking delivery unless asked for
+        self._changes = ChangeFeed(change_batch_size, change_retention, change_put_timeout)
     
     def load_config(self, filepath: str) -> bool:
         """Load configuration from YAML file with validation"""
@@ -76,10 +307,11 @@ class POIManager:
                     self.add_poi_type(type_name)
                     for attr in attributes:
                         self.add_attribute_to_type(type_name, attr)
+                    self._config_types[type_name] = list(attributes)
             
             # Load POIs with coordinate validation
             if 'pois' in config:
-                for poi_data in config['pois']:
+                for poi_data, key in zip(config['pois'], self._config_keys(config['pois'], self._config_poi_key)):
                     if not self._validate_coordinates(poi_data.get('x'), poi_data.get('y')):
                         print(f"Invalid coordinates for POI {poi_data.get('name')}")
                         continue
@@ -87,21 +319,250 @@ class POIManager:
                     poi_type = self.poi_types.get(poi_data['type'])
                     if poi_type:
                         attributes = {attr: poi_data.get(attr) for attr in poi_type.attributes if attr in poi_data}
-                        self.add_poi(poi_data['name'], poi_type.name, poi_data['x'], poi_data['y'], attributes)
+                        poi_id = poi_data.get('id')
+                        if poi_id is None:
+                            poi_id = self._poi_ids.allocate()
+                        if self.add_poi(poi_data['name'], poi_type.name, poi_data['x'], poi_data['y'],
+                                        attributes, poi_id):
+                            self._config_pois[key] = poi_id
+                        else:
+                            print(f"Duplicate id for POI {poi_data.get('name')}")
             
             # Load visitors and visits
             if 'visitors' in config:
-                for visitor_data in config['visitors']:
-                    visitor = self.add_visitor(visitor_data['name'], visitor_data.get('nationality', 'Unknown'))
+                visitor_keys = self._config_keys(config['visitors'], self._config_visitor_key)
+                for visitor_data, key in zip(config['visitors'], visitor_keys):
+                    visitor = self.add_visitor(visitor_data['name'], visitor_data.get('nationality', 'Unknown'),
+                                               visitor_data.get('id'))
+                    if visitor is None:
+                        print(f"Duplicate id for visitor {visitor_data.get('name')}")
+                        continue
+                    self._config_visitors[key] = visitor.id
                     
                     if 'visits' in visitor_data:
                         for visit_data in visitor_data['visits']:
-                            self.add_visit(visitor.id, visit_data['poi_id'], visit_data['date'], visit_data.get('rating'))
+                            if self.add_visit(visitor.id, visit_data['poi_id'], visit_data['date'], visit_data.get('rating')):
+                                self._config_visits[visitor.id][self._config_visit_key(visit_data)] += 1
             
             return True
         except Exception as e:
             print(f"Error loading config: {e}")
             return False
+
+    def _check_config_shape(self, config):
+        #Raise ValueError on structural problems, before reload_config changes anything
+        def fail(message):
+            raise ValueError(message)
+        if not isinstance(config, dict):
+            # Also catches an empty or truncated file, which must not wipe the state
+            fail("top level must be a mapping")
+        types = config.get('poi_types') or {}
+        if not isinstance(types, dict):
+            fail("poi_types must map type names to attribute lists")
+        for type_name, attributes in types.items():
+            if not isinstance(attributes, list):
+                fail(f"poi_types.{type_name} must be a list of attributes")
+        pois = config.get('pois') or []
+        if not isinstance(pois, list):
+            fail("pois must be a list")
+        for poi_data in pois:
+            if not isinstance(poi_data, dict) or 'name' not in poi_data:
+                fail(f"POI entry needs a name: {poi_data}")
+        visitors = config.get('visitors') or []
+        if not isinstance(visitors, list):
+            fail("visitors must be a list")
+        for visitor_data in visitors:
+            if not isinstance(visitor_data, dict) or 'name' not in visitor_data:
+                fail(f"visitor entry needs a name: {visitor_data}")
+            visits = visitor_data.get('visits') or []
+            if not isinstance(visits, list) or any(not isinstance(v, dict) or 'poi_id' not in v or 'date' not in v
+                                                   for v in visits):
+                fail(f"visits of {visitor_data['name']} need poi_id and date")
+
+    def _move_visitor_nationality(self, visitor: Visitor, nationality: str):
+        #Re-file a visitor and its visits under another nationality
+        old = visitor.nationality
+        self._visitors_by_nationality[old].discard(visitor.id)
+        if not self._visitors_by_nationality[old]:
+            del self._visitors_by_nationality[old]
+        visitor.nationality = nationality
+        self._visitors_by_nationality[nationality].add(visitor.id)
+        # Sketches cannot forget a visitor, so the old group is recounted
+        self._nationality_stats.pop(old, None)
+        for visitor_id in self._visitors_by_nationality.get(old, ()):
+            for visit in self.visitors[visitor_id].visits:
+                self._record_nationality_visit(old, visitor_id, visit.poi_id, visit.rating)
+        for visit in visitor.visits:
+            self._record_nationality_visit(nationality, visitor.id, visit.poi_id, visit.rating)
+
+    def _config_poi_key(self, poi_data: Dict) -> tuple:
+        #Stable identity of a config POI: its id field, else name and type
+        if poi_data.get('id') is not None:
+            return ('id', poi_data['id'])
+        return ('name', poi_data.get('name'), poi_data.get('type'))
+
+    def _config_visitor_key(self, visitor_data: Dict) -> tuple:
+        if visitor_data.get('id') is not None:
+            return ('id', visitor_data['id'])
+        return ('name', visitor_data.get('name'))
+
+    def _config_keys(self, entries, key_of) -> list:
+        #Keys for a config section in file order; name-based keys get an occurrence
+        #number so entries sharing a name (and type) stay distinct
+        seen = Counter()
+        keys = []
+        for entry in entries:
+            key = key_of(entry)
+            if key[0] == 'name':
+                seen[key] += 1
+                key = key + (seen[key],)
+            keys.append(key)
+        return keys
+
+    def _config_visit_key(self, visit_data: Dict) -> tuple:
+        return (visit_data['poi_id'], visit_data['date'], visit_data.get('rating'))
+
+    def reload_config(self, filepath: str) -> Optional[Dict[str, int]]:
+        """Re-read a YAML config and apply only what changed since the last load.
+
+        Types match by name, POIs by their id field (name, type and occurrence
+        when absent), visitors by id (name and occurrence when absent). Unchanged entities, indexes and caches are
+        left alone. Visits are only added, and visitors missing from the file are
+        kept, since neither can be deleted. Returns counts of applied changes, or
+        None if the file could not be read or is malformed; nothing is applied then.
+        """
+        changes = dict.fromkeys(('types_added', 'types_removed', 'attributes_added', 'attributes_removed',
+                                 'pois_added', 'pois_updated', 'pois_removed', 'visitors_added',
+                                 'visitors_updated', 'visits_added'), 0)
+        try:
+            with open(filepath, 'r') as file:
+                config = yaml.safe_load(file)
+            self._check_config_shape(config)
+        except Exception as e:
+            print(f"Error reloading config: {e}")
+            return None
+        try:
+            # Types and their attributes
+            types = config.get('poi_types') or {}
+            for type_name, attributes in types.items():
+                if self.add_poi_type(type_name):
+                    changes['types_added'] += 1
+                for attr in self._config_types.get(type_name, []):
+                    if attr not in attributes and self.delete_attribute_from_type(type_name, attr):
+                        changes['attributes_removed'] += 1
+                for attr in attributes:
+                    if attr not in self.poi_types[type_name].attributes:
+                        self.add_attribute_to_type(type_name, attr)
+                        changes['attributes_added'] += 1
+            
+            # POIs: deletes first, then moves/edits in place, then inserts
+            desired = {}
+            pois = config.get('pois') or []
+            for poi_data, key in zip(pois, self._config_keys(pois, self._config_poi_key)):
+                if not self._validate_coordinates(poi_data.get('x'), poi_data.get('y')):
+                    print(f"Invalid coordinates for POI {poi_data.get('name')}")
+                    continue
+                if poi_data.get('type') in self.poi_types:
+                    desired[key] = poi_data
+            
+            for key in [key for key in self._config_pois if key not in desired]:
+                if self.delete_poi(self._config_pois.pop(key)):
+                    changes['pois_removed'] += 1
+            
+            for key, poi_data in desired.items():
+                poi_type = self.poi_types[poi_data['type']]
+                attributes = {attr: poi_data.get(attr) for attr in poi_type.attributes}
+                poi_id = self._config_pois.get(key)
+                poi = self.pois.get(poi_id) if poi_id is not None else None
+                
+                if poi is None:
+                    poi_id = poi_data.get('id', poi_id)
+                    if poi_id is None:
+                        poi_id = self._poi_ids.allocate()
+                    if self.add_poi(poi_data['name'], poi_type.name, poi_data['x'], poi_data['y'], attributes, poi_id):
+                        self._config_pois[key] = poi_id
+                        changes['pois_added'] += 1
+                    else:
+                        print(f"Duplicate id for POI {poi_data.get('name')}")
+                elif poi.type is not poi_type or (poi.x, poi.y) != (poi_data['x'], poi_data['y']):
+                    # Re-insert under the same id so every spatial index moves it
+                    self.delete_poi(poi_id)
+                    self.add_poi(poi_data['name'], poi_type.name, poi_data['x'], poi_data['y'], attributes, poi_id)
+                    changes['pois_updated'] += 1
+                else:
+                    changed = poi.name != poi_data['name']
+                    poi.name = poi_data['name']
+                    current = poi.attributes
+                    for attr, value in attributes.items():
+                        if current[attr] != value:
+                            current[attr] = value
+                            changed = True
+                    if changed:
+                        changes['pois_updated'] += 1
+                        self._changes.publish('poi_updated', id=poi_id, name=poi.name, attributes=dict(current))
+            
+            for type_name in self._config_types:
+                if type_name not in types and self.delete_poi_type(type_name):
+                    changes['types_removed'] += 1
+            self._config_types = {name: list(attributes) for name, attributes in types.items()}
+            
+            # Visitors and new visits
+            visitors = config.get('visitors') or []
+            for visitor_data, key in zip(visitors, self._config_keys(visitors, self._config_visitor_key)):
+                visitor = self.visitors.get(self._config_visitors.get(key))
+                if visitor is None:
+                    visitor = self.add_visitor(visitor_data['name'], visitor_data.get('nationality', 'Unknown'),
+                                               visitor_data.get('id'))
+                    if visitor is None:
+                        print(f"Duplicate id for visitor {visitor_data.get('name')}")
+                        continue
+                    self._config_visitors[key] = visitor.id
+                    changes['visitors_added'] += 1
+                nationality = visitor_data.get('nationality', 'Unknown')
+                if (visitor.name, visitor.nationality) != (visitor_data['name'], nationality):
+                    visitor.name = visitor_data['name']
+                    if visitor.nationality != nationality:
+                        self._move_visitor_nationality(visitor, nationality)
+                    changes['visitors_updated'] += 1
+                    self._changes.publish('visitor_updated', id=visitor.id, name=visitor.name,
+                                          nationality=nationality)
+                
+                applied = self._config_visits[visitor.id]
+                wanted = Counter(self._config_visit_key(v) for v in visitor_data.get('visits') or [])
+                for (poi_id, date, rating), missing in (wanted - applied).items():
+                    for _ in range(missing):
+                        if self.add_visit(visitor.id, poi_id, date, rating):
+                            applied[(poi_id, date, rating)] += 1
+                            changes['visits_added'] += 1
+            
+            return changes
+        except Exception as e:
+            print(f"Error reloading config: {e}")
+            return None
+    
+    def export_state(self, filepath: str, fmt: str = 'yaml', types=None, region=None,
+                     chunk_size: int = 1000, entity: str = 'pois') -> int:
+        """Stream a snapshot to yaml (readable by load_config), jsonl or csv; returns records written.
+
+        types limits the export to those POI types, region to an inclusive
+        (x_min, y_min, x_max, y_max) box; visits follow the exported POIs.
+        entity picks the table for csv.
+        """
+        if fmt not in EXPORTERS:
+            raise ValueError(f"Unknown export format '{fmt}'")
+        snapshot = Snapshot(self, set(types) if types is not None else None, region)
+        with open(filepath, 'w', newline='' if fmt == 'csv' else None) as file:
+            if fmt == 'csv':
+                return EXPORTERS[fmt](snapshot, file, entity, chunk_size)
+            return EXPORTERS[fmt](snapshot, file, chunk_size)
+
+    def get_memory_report(self, sample: Optional[int] = None) -> Dict[str, Dict[str, int]]:
+        """Bytes and object counts per internal structure, plus a 'total' row.
+
+        sample sizes only that many random POIs and visitors and extrapolates,
+        trading accuracy for a bounded cost on large managers.
+        """
+        return memory_report(self, sample)
     
     # Coordinates
 
@@ -123,6 +584,7 @@ class POIManager:
         if name in self.poi_types:
             return False
         self.poi_types[name] = POIType(name)
+        self._changes.publish('poi_type_added', type=name)
         return True
     
     def delete_poi_type(self, name: str) -> bool:
@@ -135,31 +597,25 @@ class POIManager:
                 return False
         
         del self.poi_types[name]
+        self._changes.publish('poi_type_deleted', type=name)
         return True
     
     def add_attribute_to_type(self, type_name: str, attribute_name: str) -> bool:
         if type_name not in self.poi_types:
             return False
         
-        if attribute_name not in self.poi_types[type_name].attributes:
-            self.poi_types[type_name].attributes.append(attribute_name)
-            
-            # Add attribute to all existing POIs of this type
-            for poi in self.pois.values():
-                if poi.type.name == type_name and attribute_name not in poi.attributes:
-                    poi.attributes[attribute_name] = None
-        
+        # Schema-only change: existing POIs read the new attribute as None
+        if self.poi_types[type_name].add_attribute(attribute_name):
+            self._changes.publish('attribute_added', type=type_name, attribute=attribute_name)
         return True
     
     def delete_attribute_from_type(self, type_name: str, attribute_name: str) -> bool:
-        if type_name not in self.poi_types or attribute_name not in self.poi_types[type_name].attributes:
+        if type_name not in self.poi_types:
             return False
-        # remove from type
-        self.poi_types[type_name].attributes.remove(attribute_name)
-        # remove from all existing POIs of this type
-        for poi in self.pois.values():
-            if poi.type.name == type_name and attribute_name in poi.attributes:
-                del poi.attributes[attribute_name]
+        # stale values are dropped lazily by each POI on next access
+        if not self.poi_types[type_name].remove_attribute(attribute_name):
+            return False
+        self._changes.publish('attribute_deleted', type=type_name, attribute=attribute_name)
         return True
     
 
@@ -167,15 +623,10 @@ class POIManager:
     def rename_attribute(self, type_name: str, old: str, new: str) -> bool:
         if type_name not in self.poi_types:
             return False
-        attrs = self.poi_types[type_name].attributes
-        if old not in attrs or new in attrs:
+        # values are stored by slot, so only the type definition changes
+        if not self.poi_types[type_name].rename_attribute(old, new):
             return False
-        # rename in type def
-        attrs[attrs.index(old)] = new
-        # migrate existing POIs
-        for poi in self.pois.values():
-            if poi.type.name == type_name and old in poi.attributes:
-                poi.attributes[new] = poi.attributes.pop(old)
+        self._changes.publish('attribute_renamed', type=type_name, old=old, new=new)
         return True
 
     def rename_poi_type(self, old: str, new: str) -> bool:
@@ -186,35 +637,99 @@ class POIManager:
         for poi in self.pois.values():
             if poi.type.name == old:
                 poi.type = self.poi_types[new]
+        if self._density is not None:
+            self._density.rename_type(old, new)
+        self._changes.publish('poi_type_renamed', old=old, new=new)
         return True
 
 
 
 
     # POI Operations
-    def add_poi(self, name: str, type_name: str, x: int, y: int, attributes: Optional[Dict] = None) -> bool:
+    def add_poi(self, name: str, type_name: str, x: int, y: int, attributes: Optional[Dict] = None,
+                poi_id: Optional[int] = None) -> bool:
         if type_name not in self.poi_types:
             return False
         
         if not self._validate_coordinates(x, y):
             return False
         
+        # Explicit ids (e.g. from config) are honoured if free
+        if poi_id is None:
+            poi_id = self._poi_ids.allocate()
+        elif poi_id in self.pois or not self._poi_ids.claim(poi_id):
+            return False
+        
         poi_type = self.poi_types[type_name]
-        poi = POI(name, poi_type, x, y, attributes)
+        poi = POI(name, poi_type, x, y, attributes, poi_id)
         self.pois[poi.id] = poi
+        self._index_poi(poi)
+        self._changes.publish('poi_added', id=poi.id, name=name, type=type_name, x=x, y=y)
         return True
     
     def delete_poi(self, poi_id: int) -> bool:
         if poi_id not in self.pois:
             return False
         
-        del self.pois[poi_id]
+        self._unindex_poi(self.pois.pop(poi_id))
+        self._poi_ids.release(poi_id)
+        self._changes.publish('poi_deleted', id=poi_id)
         return True
+
+    def reserve_poi_ids(self, count: int) -> range:
+        """Reserve a contiguous block of ids for a bulk load via add_poi(..., poi_id=...)"""
+        return self._poi_ids.reserve(count)
+
+    def _index_poi(self, poi: POI):
+        #Keep spatial structures in sync with self.pois
+        self._grid.add(poi)
+        if self._density is not None:
+            self._density.add(poi)
+        if self._nearest is not None:
+            self._nearest.add(poi)
+        if self._morton is not None:
+            self._morton.add(poi)
+
+    def _unindex_poi(self, poi: POI):
+        self._grid.remove(poi)
+        if self._density is not None:
+            self._density.remove(poi)
+        if self._nearest is not None:
+            self._nearest.remove(poi)
+        if self._morton is not None:
+            self._morton.remove(poi)
+    
+    # Change Feed
+    def subscribe_changes(self, kinds=None, from_seq: Optional[int] = None, maxsize: int = 64) -> Subscription:
+        """Receive batches of mutation events (all kinds if None), replaying from from_seq if given.
+
+        Replay needs change_retention on the manager. A subscriber whose queue
+        overflows is dropped and marked lagged (see change_put_timeout).
+        """
+        return self._changes.subscribe(kinds, from_seq, maxsize)
+
+    def flush_changes(self):
+        """Deliver buffered events without waiting for a full batch"""
+        self._changes.flush()
+
+    def replay_changes(self, from_seq: int, kinds=None):
+        return self._changes.replay(from_seq, kinds)
+
+    @property
+    def change_seq(self) -> int:
+        """Sequence number of the latest mutation"""
+        return self._changes.seq
     
     # Visitor Operations
-    def add_visitor(self, name: str, nationality: str):
-        visitor = Visitor(name, nationality)
+    def add_visitor(self, name: str, nationality: str, visitor_id: Optional[int] = None):
+        if visitor_id is None:
+            visitor_id = self._visitor_ids.allocate()
+        elif visitor_id in self.visitors or not self._visitor_ids.claim(visitor_id):
+            return None
+        visitor = Visitor(name, nationality, visitor_id)
         self.visitors[visitor.id] = visitor
+        self._visitors_by_nationality[nationality].add(visitor.id)
+        self._changes.publish('visitor_added', id=visitor.id, name=name, nationality=nationality)
         return visitor
     
     def add_visit(self, visitor_id: int, poi_id: int, date: str, rating: Optional[int] = None) -> bool:
@@ -228,13 +743,52 @@ class POIManager:
         # Validate date format dd/mm/yyyy
         from datetime import datetime
         try:
-            datetime.strptime(date, "%d/%m/%Y")
+            day = datetime.strptime(date, "%d/%m/%Y").toordinal()
         except ValueError:
             return False
         
         visit = Visit(poi_id, date, rating)
-        self.visitors[visitor_id].visits.append(visit)
+        visitor = self.visitors[visitor_id]
+        # Insert in date order; same-day visits keep insertion order
+        key = (day, visitor._visit_seq)
+        visitor._visit_seq += 1
+        position = bisect_right(visitor._visit_keys, key)
+        visitor._visit_keys.insert(position, key)
+        visitor.visits.insert(position, visit)
+        self._record_nationality_visit(visitor.nationality, visitor_id, poi_id, rating)
+        if self.cardinality_mode == 'approximate':
+            self._sketch(self._poi_visitor_sketches, poi_id).add(visitor_id)
+            self._sketch(self._visitor_poi_sketches, visitor_id).add(poi_id)
+        if self._covisits is not None:
+            self._covisits.record(visitor_id, poi_id)
+        self._changes.publish('visit_added', visitor_id=visitor_id, poi_id=poi_id, date=date, rating=rating)
         return True
+
+    def _record_nationality_visit(self, nationality: str, visitor_id: int, poi_id: int, rating: Optional[int]):
+        stats = self._nationality_stats[nationality]
+        if poi_id not in stats:
+            # Approximate mode bounds memory with a sketch instead of a visitor set
+            stats[poi_id] = VisitStats(self._new_sketch() if self.cardinality_mode == 'approximate' else None)
+        stats[poi_id].add(visitor_id, rating)
+
+    def _new_sketch(self) -> HyperLogLog:
+        return HyperLogLog(self.cardinality_error)
+
+    def _sketch(self, sketches: Dict[int, HyperLogLog], key: int) -> HyperLogLog:
+        sketch = sketches.get(key)
+        if sketch is None:
+            sketch = sketches[key] = self._new_sketch()
+        return sketch
+
+    def get_poi_sketch(self, poi_id: int) -> Optional[HyperLogLog]:
+        """Copy of a POI's unique-visitor sketch, mergeable across shards or time buckets"""
+        sketch = self._poi_visitor_sketches.get(poi_id)
+        return sketch.copy() if sketch is not None else None
+
+    def get_visitor_sketch(self, visitor_id: int) -> Optional[HyperLogLog]:
+        """Copy of a visitor's unique-POI sketch"""
+        sketch = self._visitor_poi_sketches.get(visitor_id)
+        return sketch.copy() if sketch is not None else None
     
     # POI Queries
     def get_poi_by_type(self, type_name: str):
@@ -262,6 +816,15 @@ class POIManager:
         
         return closest_pair
     
+    def find_poi_pairs_within(self, distance: float, epsilon: float = 1e-6):
+        """Lazily yield (id1, id2, distance) for all POI pairs closer than distance"""
+        return pairs_within(list(self.pois.values()), distance, epsilon)
+
+    def cluster_poi(self, distance: float, min_size: int = 2, epsilon: float = 1e-6):
+        """Groups of POI ids connected by pairs within distance (e.g. duplicates)"""
+        clusters = connected_components(self.find_poi_pairs_within(distance, epsilon))
+        return [c for c in clusters if len(c) >= min_size]
+
     def count_poi_by_type(self):
         counts = defaultdict(int)
         for poi in self.pois.values():
@@ -269,6 +832,13 @@ class POIManager:
         return dict(counts)
     
     def find_poi_in_radius(self, x, y, radius, epsilon: float = 1e-6):
+        if self._morton is not None:
+            # Equal distances come out by id rather than insertion order
+            results = []
+            for poi_id, d in self._morton.query_radius(x, y, radius, epsilon):
+                poi = self.pois[poi_id]
+                results.append((poi.id, poi.name, (poi.x, poi.y), poi.type.name, d))
+            return results
         results = []
         for poi in self.pois.values():
             d = self._calculate_distance(poi.x, poi.y, x, y) #d - distance
@@ -278,6 +848,13 @@ class POIManager:
 
     
     def find_k_closest_poi(self, x: int, y: int, k: int):
+        if k == 1 and self._nearest is not None and self._validate_coordinates(x, y):
+            poi_id = self._nearest.nearest(x, y)
+            if poi_id is None:
+                return []
+            poi = self.pois[poi_id]
+            return [(poi, self._calculate_distance(poi.x, poi.y, x, y))]
+        
         distances = []
         for poi in self.pois.values():
             distance = self._calculate_distance(poi.x, poi.y, x, y)
@@ -295,14 +872,140 @@ class POIManager:
         
         return results
     
+    def _region_results(self, pois):
+        #Same leading fields as find_poi_in_radius, ordered by id
+        return sorted(((poi.id, poi.name, (poi.x, poi.y), poi.type.name) for poi in pois),
+                      key=lambda r: r[0])
+
+    def find_poi_in_rect(self, x_min: int, y_min: int, x_max: int, y_max: int):
+        """POIs inside an inclusive bounding box"""
+        # Always the bucket grid: it beats the Morton store at every rectangle size
+        found = []
+        for cx, cy in self._grid.cells_in_rect(x_min, y_min, x_max, y_max):
+            bucket = self._grid.buckets[(cx, cy)]
+            bx0, by0, bx1, by1 = self._grid.cell_bounds(cx, cy)
+            if x_min <= bx0 and bx1 <= x_max and y_min <= by0 and by1 <= y_max:
+                found.extend(bucket.values())
+            else:
+                found.extend(poi for poi in bucket.values()
+                             if x_min <= poi.x <= x_max and y_min <= poi.y <= y_max)
+        return self._region_results(found)
+
+    def find_poi_in_polygon(self, polygon):
+        """POIs inside a polygon given as [(x, y), ...]; edges are inclusive"""
+        if len(polygon) < 3:
+            return []
+        return self._region_results(polygon_candidates(self._grid, polygon))
+
+    def assign_pois_to_regions(self, regions: Dict[str, list]) -> Dict[int, str]:
+        """Spatial join: poi_id -> name of the first region (polygon) containing it"""
+        assignment = {}
+        for region_name, polygon in regions.items():
+            if len(polygon) < 3:
+                continue
+            for poi in polygon_candidates(self._grid, polygon):
+                assignment.setdefault(poi.id, region_name)
+        return assignment
+
+    # Nearest-POI Raster
+    def enable_nearest_raster(self) -> NearestRaster:
+        """Precompute the nearest POI for every map cell so 1-NN is a lookup"""
+        self._nearest = NearestRaster(self.map_size)
+        self._nearest.build(self.pois.values())
+        return self._nearest
+
+    def disable_nearest_raster(self):
+        self._nearest = None
+
+    # Z-order Store
+    def enable_morton_store(self, buffer_size: int = 256) -> MortonStore:
+        """Keep POIs in Morton-sorted arrays and answer radius queries from them"""
+        self._morton = MortonStore(self.map_size, buffer_size)
+        self._morton.build(self.pois.values())
+        return self._morton
+
+    def disable_morton_store(self):
+        self._morton = None
+
+    # Density Raster
+    def enable_density_raster(self, cell_size: int = 1) -> DensityRaster:
+        """Build a per-type density raster; kept in sync by add_poi/delete_poi"""
+        self._density = DensityRaster(self.map_size, cell_size)
+        for poi in self.pois.values():
+            self._density.add(poi)
+        return self._density
+
+    def count_poi_in_rect(self, x_min: int, y_min: int, x_max: int, y_max: int,
+                          type_name: Optional[str] = None) -> int:
+        """Exact number of POIs in an inclusive rectangle.
+
+        Answered from the density raster in O(log² cells) when one is enabled
+        and the rectangle covers whole raster cells; otherwise counted from
+        the spatial grid buckets.
+        """
+        if self._density is not None and self._density.is_aligned(x_min, y_min, x_max, y_max):
+            return self._density.count_in_rect(x_min, y_min, x_max, y_max, type_name)
+        count = 0
+        for cx, cy in self._grid.cells_in_rect(x_min, y_min, x_max, y_max):
+            count += sum(1 for poi in self._grid.buckets[(cx, cy)].values()
+                         if x_min <= poi.x <= x_max and y_min <= poi.y <= y_max
+                         and (type_name is None or poi.type.name == type_name))
+        return count
+
+    def get_density_heatmap(self, type_name: Optional[str] = None):
+        """Per-cell POI counts as a list of rows, for the map UI.
+
+        Without an enabled raster this builds one with about 100 cells per
+        side (cell_size = map_size // 100), not one cell per map unit.
+        """
+        if self._density is None:
+            self.enable_density_raster(max(1, self.map_size // 100))
+        return self._density.heatmap(type_name)
+
     # Visitor Queries
     def get_visitor_history(self, visitor_id: int):
         if visitor_id not in self.visitors:
             return None
         return self.visitors[visitor_id].visits
     
+    def _unique_pois_per_visitor(self):
+        #visitor -> number of unique POIs, estimated in approximate mode
+        for visitor in self.visitors.values():
+            if self.cardinality_mode == 'approximate':
+                sketch = self._visitor_poi_sketches.get(visitor.id)
+                yield visitor, sketch.count() if sketch is not None else 0
+            else:
+                yield visitor, len(set(visit.poi_id for visit in visitor.visits))
+
+    def get_visitor_history_page(self, visitor_id: int, cursor: Optional[tuple] = None, limit: int = 20):
+        """One page of a visitor's visits in date order: ([(visit, poi_name), ...], next_cursor).
+
+        Pass next_cursor back to get the following page; it is None after the last one.
+        Cursors point at a visit, not an offset, so visits added meanwhile are not skipped
+        or repeated.
+        """
+        if limit < 1:
+            raise ValueError("limit must be >= 1")
+        if visitor_id not in self.visitors:
+            return None
+        visitor = self.visitors[visitor_id]
+        start = 0 if cursor is None else bisect_right(visitor._visit_keys, tuple(cursor))
+        end = min(start + limit, len(visitor.visits))
+        page = visitor.visits[start:end]
+        
+        # Resolve POI names once per distinct POI on the page
+        names = {}
+        for poi_id in {visit.poi_id for visit in page}:
+            poi = self.pois.get(poi_id)
+            names[poi_id] = poi.name if poi else None
+        
+        next_cursor = visitor._visit_keys[end - 1] if end < len(visitor.visits) else None
+        return [(visit, names[visit.poi_id]) for visit in page], next_cursor
+
     def get_poi_popularity(self):
         """Number of unique visitors per POI"""
+        if self.cardinality_mode == 'approximate':
+            return [(poi_id, sketch.count()) for poi_id, sketch in self._poi_visitor_sketches.items()]
         popularity = defaultdict(set)
         for visitor in self.visitors.values():
             for visit in visitor.visits:
@@ -313,18 +1016,14 @@ class POIManager:
     def get_visitor_activity(self):
         """Number of unique POIs per visitor"""
         activity = {}
-        for visitor in self.visitors.values():
-            unique_pois = set(visit.poi_id for visit in visitor.visits)
-            activity[visitor.id] = len(unique_pois)
+        for visitor, count in self._unique_pois_per_visitor():
+            activity[visitor.id] = count
         
         return list(activity.items())
     
     def get_top_k_visitors(self, k: int):
         """Top k visitors by number of unique POIs visited"""
-        visitor_counts = []
-        for visitor in self.visitors.values():
-            unique_pois = set(visit.poi_id for visit in visitor.visits)
-            visitor_counts.append((visitor, len(unique_pois)))
+        visitor_counts = list(self._unique_pois_per_visitor())
         
         # Sort by count desc, tie-break: id asc, then name asc (brief)
         visitor_counts.sort(key=lambda x: (-x[1], x[0].id, x[0].name))
@@ -332,20 +1031,70 @@ class POIManager:
     
     def get_top_k_poi(self, k: int):
         """Top k POIs by number of unique visitors"""
-        poi_counts = defaultdict(set)
-        for visitor in self.visitors.values():
-            for visit in visitor.visits:
-                poi_counts[visit.poi_id].add(visitor.id)
-        
         results = []
-        for poi_id, visitors in poi_counts.items():
+        for poi_id, count in self.get_poi_popularity():
             if poi_id in self.pois:
-                results.append((self.pois[poi_id], len(visitors)))
+                results.append((self.pois[poi_id], count))
         
         # Sort by count desc, tie-break: id asc, then name asc (brief)
         results.sort(key=lambda x: (-x[1], x[0].id, x[0].name))
         return results[:min(k, len(results))]
     
+    def enable_covisitation_index(self, history_cap: int = 50, chunk_size: int = 1000) -> CoVisitationIndex:
+        """Build the co-visitation index from existing visits; add_visit keeps it current"""
+        self._covisits = CoVisitationIndex(history_cap)
+        self._covisits.build(self.visitors.values(), chunk_size)
+        return self._covisits
+
+    def get_covisited_poi(self, poi_id: int, k: int):
+        """Top k POIs most often visited by the same visitors as poi_id"""
+        if poi_id not in self.pois:
+            return None
+        if self._covisits is None:
+            self.enable_covisitation_index()
+        # over-fetch so deleted POIs can be skipped
+        results = []
+        for other_id, count in self._covisits.top_k(poi_id, len(self._covisits.counts.get(poi_id, ()))):
+            if other_id in self.pois:
+                results.append((self.pois[other_id], count))
+                if len(results) == k:
+                    break
+        return results
+
+    # Nationality Queries
+    def get_visitors_by_nationality(self, nationality: str):
+        return [self.visitors[vid] for vid in sorted(self._visitors_by_nationality.get(nationality, ()))]
+
+    def get_nationality_poi_stats(self, nationality: str):
+        """Per POI for one nationality: (poi_id, visits, unique visitors, average rating)"""
+        results = [(poi_id, stats.visits, stats.unique_visitors, stats.average_rating)
+                   for poi_id, stats in self._nationality_stats.get(nationality, {}).items()]
+        results.sort(key=lambda x: (-x[1], x[0]))
+        return results
+
+    def get_nationality_summary(self):
+        """Per nationality: (nationality, visitors, visits, unique POIs, average rating)"""
+        results = []
+        for nationality, visitor_ids in self._visitors_by_nationality.items():
+            per_poi = self._nationality_stats.get(nationality, {})
+            visits = sum(stats.visits for stats in per_poi.values())
+            rated = sum(stats.rated for stats in per_poi.values())
+            rating_sum = sum(stats.rating_sum for stats in per_poi.values())
+            results.append((nationality, len(visitor_ids), visits, len(per_poi),
+                            rating_sum / rated if rated else None))
+        return results
+
+    def get_top_k_poi_by_nationality(self, nationality: str, k: int):
+        """Top k POIs by unique visitors of one nationality"""
+        results = []
+        for poi_id, stats in self._nationality_stats.get(nationality, {}).items():
+            if poi_id in self.pois:
+                results.append((self.pois[poi_id], stats.unique_visitors))
+        
+        # Same ordering as get_top_k_poi
+        results.sort(key=lambda x: (-x[1], x[0].id, x[0].name))
+        return results[:min(k, len(results))]
+
     def get_diverse_visitors(self, m: int, t: int):
         """Visitors with at least m POIs across t distinct types"""
         results = []
@@ -0,0 +1,161 @@
+import heapq
+import math
+from array import array
+from bisect import bisect_left, bisect_right
+from typing import Dict, Iterator, List, Set, Tuple
+
+Box = Tuple[int, int, int, int]
+
+
+def _spread(v: int) -> int:
+    #Put the low 32 bits of v on the even bit positions
+    v &= 0xFFFFFFFF
+    v = (v | (v << 16)) & 0x0000FFFF0000FFFF
+    v = (v | (v << 8)) & 0x00FF00FF00FF00FF
+    v = (v | (v << 4)) & 0x0F0F0F0F0F0F0F0F
+    v = (v | (v << 2)) & 0x3333333333333333
+    return (v | (v << 1)) & 0x5555555555555555
+
+
+def morton_code(x: int, y: int) -> int:
+    """Z-order code of a cell: x bits on even positions, y bits on odd ones"""
+    return _spread(x) | (_spread(y) << 1)
+
+
+def split_box(box: Box) -> Tuple[Box, Box]:
+    """Split a box at its highest differing code bit into (lower, upper) halves.
+
+    Every code in the lower half is smaller than every code in the upper one;
+    LITMAX is the lower half's largest code, BIGMIN the upper half's smallest.
+    """
+    x0, y0, x1, y1 = box
+    bit = (morton_code(x0, y0) ^ morton_code(x1, y1)).bit_length() - 1
+    k = bit >> 1
+    if bit & 1:
+        split = (y1 >> k) << k
+        return (x0, y0, x1, split - 1), (x0, split, x1, y1)
+    split = (x1 >> k) << k
+    return (x0, y0, split - 1, y1), (split, y0, x1, y1)
+
+
+def decompose(box: Box, max_ranges: int = 16) -> List[Tuple[int, int, bool]]:
+    """Cover a box with a few code ranges: (lo, hi, is_block), ordered by lo.
+
+    The range with the most codes outside the box is split at its LITMAX/BIGMIN
+    point until the ranges cover at most twice the box's area or max_ranges is
+    reached. Ranges that are whole blocks need no per-point check.
+    """
+    def entry(b: Box):
+        lo, hi = morton_code(b[0], b[1]), morton_code(b[2], b[3])
+        return (-(hi - lo + 1 - (b[2] - b[0] + 1) * (b[3] - b[1] + 1)), lo, hi, b)
+
+    area = (box[2] - box[0] + 1) * (box[3] - box[1] + 1)
+    heap = [entry(box)]
+    waste = -heap[0][0]
+    while len(heap) < max_ranges and waste > area:
+        widest_waste, _, _, widest = heapq.heappop(heap)
+        waste += widest_waste
+        for half in split_box(widest):
+            half_entry = entry(half)
+            waste -= half_entry[0]
+            heapq.heappush(heap, half_entry)
+    return sorted((lo, hi, range_waste == 0) for range_waste, lo, hi, _ in heap)
+
+
+class MortonStore:
+    """POIs in compact arrays sorted by Z-order code, for cache-friendly scans.
+
+    Rows are (code, id, x, y) in parallel arrays, so queries read contiguous
+    machine ints instead of POI objects. A rectangle becomes a few code ranges
+    (see decompose), each one bisect and one slice of the arrays. Inserts go
+    to a small buffer and deletes to a tombstone set; both are folded into the
+    arrays once either reaches buffer_size.
+    """
+
+    def __init__(self, map_size: int, buffer_size: int = 256, max_ranges: int = 16):
+        if buffer_size < 1:
+            raise ValueError("buffer_size must be >= 1")
+        self.map_size = map_size
+        self.buffer_size = buffer_size
+        self.max_ranges = max_ranges
+        self.codes = array('Q')
+        self.ids = array('q')
+        self.xs = array('i')
+        self.ys = array('i')
+        self._buffer: Dict[int, Tuple[int, int, int]] = {}
+        self._deleted: Set[int] = set()
+
+    def __len__(self) -> int:
+        return len(self.codes) - len(self._deleted) + len(self._buffer)
+
+    def build(self, pois):
+        for poi in pois:
+            self._buffer[poi.id] = (morton_code(poi.x, poi.y), poi.x, poi.y)
+        self.merge()
+
+    def add(self, poi):
+        if poi.id in self._deleted:
+            # The stale row must go before the id can be live again
+            self.merge()
+        self._buffer[poi.id] = (morton_code(poi.x, poi.y), poi.x, poi.y)
+        if len(self._buffer) >= self.buffer_size:
+            self.merge()
+
+    def remove(self, poi):
+        if self._buffer.pop(poi.id, None) is None:
+            self._deleted.add(poi.id)
+            if len(self._deleted) >= self.buffer_size:
+                self.merge()
+
+    def merge(self):
+        """Fold the insert buffer and tombstones into the sorted arrays"""
+        if not self._buffer and not self._deleted:
+            return
+        deleted = self._deleted
+        rows = list(zip(self.codes, self.ids, self.xs, self.ys))
+        if deleted:
+            rows = [row for row in rows if row[1] not in deleted]
+        rows.extend(sorted((code, poi_id, x, y) for poi_id, (code, x, y) in self._buffer.items()))
+        # Two sorted runs: timsort merges them in linear time
+        rows.sort()
+        self.codes = array('Q', (row[0] for row in rows))
+        self.ids = array('q', (row[1] for row in rows))
+        self.xs = array('i', (row[2] for row in rows))
+        self.ys = array('i', (row[3] for row in rows))
+        self._buffer = {}
+        self._deleted = set()
+
+    def query_rect(self, x_min: float, y_min: float, x_max: float, y_max: float) -> Iterator[Tuple[int, int, int]]:
+        """(id, x, y) of POIs inside an inclusive rectangle, in no particular order"""
+        x0, y0 = max(0, math.ceil(x_min)), max(0, math.ceil(y_min))
+        x1, y1 = min(self.map_size - 1, math.floor(x_max)), min(self.map_size - 1, math.floor(y_max))
+        if x0 > x1 or y0 > y1:
+            return
+        codes, ids, xs, ys = self.codes, self.ids, self.xs, self.ys
+        found = []
+        for lo, hi, is_block in decompose((x0, y0, x1, y1), self.max_ranges):
+            start = bisect_left(codes, lo)
+            end = bisect_right(codes, hi, start)
+            # Slices keep the per-row work in C
+            rows = zip(ids[start:end], xs[start:end], ys[start:end])
+            if is_block:
+                found.extend(rows)
+            else:
+                found.extend(row for row in rows if x0 <= row[1] <= x1 and y0 <= row[2] <= y1)
+        if self._deleted:
+            found = [row for row in found if row[0] not in self._deleted]
+        yield from found
+        for poi_id, (_, x, y) in self._buffer.items():
+            if x0 <= x <= x1 and y0 <= y <= y1:
+                yield poi_id, x, y
+
+    def query_radius(self, x: float, y: float, radius: float, epsilon: float = 1e-6) -> List[Tuple[int, float]]:
+        """(id, distance) of POIs within radius (inclusive up to epsilon), nearest first"""
+        reach = radius + epsilon
+        found = []
+        for poi_id, px, py in self.query_rect(x - reach, y - reach, x + reach, y + reach):
+            d = math.sqrt((px - x) ** 2 + (py - y) ** 2)
+            if d <= radius or abs(d - radius) < epsilon:
+                found.append((poi_id, d))
+        found.sort(key=lambda item: (item[1], item[0]))
+        return found
@@ -0,0 +1,195 @@
+import math
+import multiprocessing
+from typing import Dict, List, Optional, Tuple
+
+from ids import IdAllocator
+from models import POIManager
+from spatial import pairs_within
+
+
+def _border_pois(manager: POIManager, bounds: Tuple[int, int, int, int], distance: float):
+    #POIs closer than distance to any edge of the tile: the only ones that can pair across tiles
+    x0, y0, x1, y1 = bounds
+    return [poi for poi in manager.pois.values()
+            if min(poi.x - x0, x1 - poi.x, poi.y - y0, y1 - poi.y) < distance]
+
+
+# Operations a shard runs besides plain POIManager methods
+_SHARD_OPS = {
+    'border_pois': _border_pois,
+}
+
+
+def _serve(conn, map_size: int):
+    """Worker loop: owns one POIManager and answers (method, args) requests"""
+    manager = POIManager()
+    manager.map_size = map_size
+    while True:
+        try:
+            request = conn.recv()
+        except EOFError:
+            break
+        if request is None:
+            break
+        method, args = request
+        try:
+            if method in _SHARD_OPS:
+                result = _SHARD_OPS[method](manager, *args)
+            else:
+                result = getattr(manager, method)(*args)
+            conn.send(('ok', result))
+        except Exception as e:
+            conn.send(('error', repr(e)))
+    conn.close()
+
+
+class ShardedPOIManager:
+    """POIManager partitioned into square map tiles, one worker process per tile.
+
+    Writes go to the tile owning the coordinates; spatial queries only scatter
+    to the tiles they can touch and merge the answers. Workers talk over
+    multiprocessing pipes, so everything runs on one machine.
+    """
+
+    def __init__(self, tiles_per_side: int = 2, map_size: int = 1000):
+        if tiles_per_side < 1:
+            raise ValueError("tiles_per_side must be >= 1")
+        self.map_size = map_size
+        self.tiles_per_side = tiles_per_side
+        self.tile_size = math.ceil(map_size / tiles_per_side)
+        self._poi_ids = IdAllocator()
+        self._poi_tiles: Dict[int, int] = {}
+        self._conns = []
+        self._workers = []
+        for _ in range(tiles_per_side * tiles_per_side):
+            parent, child = multiprocessing.Pipe()
+            worker = multiprocessing.Process(target=_serve, args=(child, map_size), daemon=True)
+            worker.start()
+            child.close()
+            self._conns.append(parent)
+            self._workers.append(worker)
+
+    # Plumbing
+    def close(self):
+        for conn in self._conns:
+            try:
+                conn.send(None)
+                conn.close()
+            except OSError:
+                pass
+        for worker in self._workers:
+            worker.join(timeout=5)
+        self._conns = []
+        self._workers = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def __len__(self):
+        return len(self._poi_tiles)
+
+    def _scatter(self, tiles: List[int], method: str, *args) -> List:
+        return self._gather([(tile, method, args) for tile in tiles])
+
+    def _gather(self, requests: List[Tuple[int, str, tuple]]) -> List:
+        #Send every request first so the shards work in parallel, then collect in order
+        for tile, method, args in requests:
+            self._conns[tile].send((method, args))
+        results = []
+        for tile, method, _ in requests:
+            status, result = self._conns[tile].recv()
+            if status != 'ok':
+                raise RuntimeError(f"Shard {tile} failed in {method}: {result}")
+            results.append(result)
+        return results
+
+    def _all_tiles(self) -> List[int]:
+        return list(range(len(self._conns)))
+
+    def _tile_of(self, x: int, y: int) -> int:
+        return (y // self.tile_size) * self.tiles_per_side + (x // self.tile_size)
+
+    def tile_bounds(self, tile: int) -> Tuple[int, int, int, int]:
+        #Inclusive bounds of a tile
+        tx, ty = tile % self.tiles_per_side, tile // self.tiles_per_side
+        x0, y0 = tx * self.tile_size, ty * self.tile_size
+        return (x0, y0, min(x0 + self.tile_size, self.map_size) - 1, min(y0 + self.tile_size, self.map_size) - 1)
+
+    def _tile_distance(self, tile: int, x: float, y: float) -> float:
+        x0, y0, x1, y1 = self.tile_bounds(tile)
+        dx = max(x0 - x, 0, x - x1)
+        dy = max(y0 - y, 0, y - y1)
+        return math.sqrt(dx * dx + dy * dy)
+
+    # Types are replicated to every shard
+    def add_poi_type(self, name: str) -> bool:
+        return all(self._scatter(self._all_tiles(), 'add_poi_type', name))
+
+    def add_attribute_to_type(self, type_name: str, attribute_name: str) -> bool:
+        return all(self._scatter(self._all_tiles(), 'add_attribute_to_type', type_name, attribute_name))
+
+    # POI Operations
+    def add_poi(self, name: str, type_name: str, x: int, y: int, attributes: Optional[Dict] = None,
+                poi_id: Optional[int] = None) -> bool:
+        if not (isinstance(x, int) and isinstance(y, int) and 0 <= x < self.map_size and 0 <= y < self.map_size):
+            return False
+        # Ids are global, so the coordinator hands them out
+        if poi_id is None:
+            poi_id = self._poi_ids.allocate()
+        elif poi_id in self._poi_tiles or not self._poi_ids.claim(poi_id):
+            return False
+        tile = self._tile_of(x, y)
+        if not self._scatter([tile], 'add_poi', name, type_name, x, y, attributes, poi_id)[0]:
+            return False
+        self._poi_tiles[poi_id] = tile
+        return True
+
+    def delete_poi(self, poi_id: int) -> bool:
+        tile = self._poi_tiles.pop(poi_id, None)
+        if tile is None:
+            return False
+        return self._scatter([tile], 'delete_poi', poi_id)[0]
+
+    # POI Queries
+    def find_poi_in_radius(self, x, y, radius, epsilon: float = 1e-6):
+        tiles = [t for t in self._all_tiles() if self._tile_distance(t, x, y) <= radius + epsilon]
+        results = []
+        for part in self._scatter(tiles, 'find_poi_in_radius', x, y, radius, epsilon):
+            results.extend(part)
+        return sorted(results, key=lambda r: r[4])
+
+    def find_k_closest_poi(self, x: int, y: int, k: int):
+        if k <= 0:
+            return []
+        tiles = sorted(self._all_tiles(), key=lambda t: self._tile_distance(t, x, y))
+        # Ask the nearest tile first; its k-th distance bounds which other tiles can contribute
+        results = self._scatter(tiles[:1], 'find_k_closest_poi', x, y, k)[0]
+        bound = results[-1][1] if len(results) >= k else float('inf')
+        rest = [t for t in tiles[1:] if self._tile_distance(t, x, y) <= bound]
+        for part in self._scatter(rest, 'find_k_closest_poi', x, y, k):
+            results.extend(part)
+        results.sort(key=lambda r: r[1])
+        return results[:k]
+
+    def find_closest_poi_pair(self):
+        if len(self._poi_tiles) < 2:
+            return None
+        tiles = self._all_tiles()
+        best = None
+        for pair in self._scatter(tiles, 'find_closest_poi_pair'):
+            if pair is not None and (best is None or pair[2] < best[2]):
+                best = pair
+        # Pairs across tile borders: only POIs within the best distance of a border qualify
+        reach = best[2] if best is not None else float('inf')
+        border = []
+        for part in self._gather([(t, 'border_pois', (self.tile_bounds(t), reach)) for t in tiles]):
+            border.extend(part)
+        by_id = {poi.id: poi for poi in border}
+        join_distance = reach if reach != float('inf') else self.map_size * 2
+        for id1, id2, d in pairs_within(border, join_distance, 0):
+            if best is None or d < best[2]:
+                best = (by_id[id1], by_id[id2], d)
+        return best
@@ -0,0 +1,102 @@
+import hashlib
+import math
+from typing import Dict, Optional
+
+_MASK64 = (1 << 64) - 1
+
+
+def _hash64(item) -> int:
+    #splitmix64 finaliser for ints (ids), blake2b for anything else
+    if isinstance(item, int):
+        z = (item + 0x9E3779B97F4A7C15) & _MASK64
+        z = ((z ^ (z >> 30)) * 0xBF58476D1CE4E5B9) & _MASK64
+        z = ((z ^ (z >> 27)) * 0x94D049BB133111EB) & _MASK64
+        return z ^ (z >> 31)
+    return int.from_bytes(hashlib.blake2b(repr(item).encode(), digest_size=8).digest(), 'big')
+
+
+def precision_for_error(error: float) -> int:
+    """Smallest precision p whose standard error 1.04/sqrt(2^p) is within error"""
+    if not 0 < error < 1:
+        raise ValueError("error must be between 0 and 1")
+    p = math.ceil(math.log2((1.04 / error) ** 2))
+    return min(max(p, 4), 18)
+
+
+class HyperLogLog:
+    """Mergeable distinct-count sketch with relative standard error ~1.04/sqrt(2^p).
+
+    Registers start in a sparse dict and switch to a dense bytearray once that
+    stops saving memory, so rarely visited POIs stay cheap.
+    """
+
+    def __init__(self, error: float = 0.01, precision: Optional[int] = None):
+        self.precision = precision if precision is not None else precision_for_error(error)
+        self.m = 1 << self.precision
+        self._sparse: Optional[Dict[int, int]] = {}
+        self._dense: Optional[bytearray] = None
+
+    def add(self, item):
+        h = _hash64(item)
+        index = h >> (64 - self.precision)
+        rest = h & ((1 << (64 - self.precision)) - 1)
+        rank = (64 - self.precision) - rest.bit_length() + 1
+        self._set(index, rank)
+
+    def _set(self, index: int, rank: int):
+        if self._dense is not None:
+            if rank > self._dense[index]:
+                self._dense[index] = rank
+            return
+        if rank > self._sparse.get(index, 0):
+            self._sparse[index] = rank
+            # a dict entry costs ~100 bytes vs 1 byte per dense register
+            if len(self._sparse) > self.m // 128:
+                self._densify()
+
+    def _densify(self):
+        dense = bytearray(self.m)
+        for index, rank in self._sparse.items():
+            dense[index] = rank
+        self._dense = dense
+        self._sparse = None
+
+    def _registers(self):
+        if self._dense is not None:
+            return enumerate(self._dense)
+        return self._sparse.items()
+
+    def merge(self, other: "HyperLogLog") -> "HyperLogLog":
+        """Fold another sketch (same precision) into this one, e.g. across shards or time buckets"""
+        if other.precision != self.precision:
+            raise ValueError("cannot merge sketches with different precision")
+        for index, rank in other._registers():
+            if rank:
+                self._set(index, rank)
+        return self
+
+    def copy(self) -> "HyperLogLog":
+        clone = HyperLogLog(precision=self.precision)
+        return clone.merge(self)
+
+    def count(self) -> int:
+        m = self.m
+        if self._dense is not None:
+            registers = self._dense
+            zeros = registers.count(0)
+            total = sum(2.0 ** -r for r in registers)
+        else:
+            zeros = m - len(self._sparse)
+            total = zeros + sum(2.0 ** -r for r in self._sparse.values())
+        alpha = 0.7213 / (1 + 1.079 / m) if m >= 128 else {16: 0.673, 32: 0.697, 64: 0.709}[m]
+        estimate = alpha * m * m / total
+        # small-range correction: linear counting while registers are still empty
+        if estimate <= 2.5 * m and zeros:
+            estimate = m * math.log(m / zeros)
+        return int(round(estimate))
+
+    def __len__(self):
+        return self.count()
+
+    def __repr__(self):
+        return f"HyperLogLog(precision={self.precision}, estimate={self.count()})"
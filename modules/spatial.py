@@ -0,0 +1,184 @@
+import math
+from typing import Dict, Iterable, Iterator, List, Sequence, Tuple
+
+Point = Tuple[float, float]
+
+
+class SpatialGrid:
+    """Uniform bucket grid over POI coordinates: (cx, cy) -> {poi_id: poi}"""
+
+    def __init__(self, cell_size: int = 50):
+        if cell_size < 1:
+            raise ValueError("cell_size must be >= 1")
+        self.cell_size = cell_size
+        self.buckets: Dict[Tuple[int, int], Dict[int, object]] = {}
+
+    def _key(self, x: int, y: int) -> Tuple[int, int]:
+        return (x // self.cell_size, y // self.cell_size)
+
+    def add(self, poi):
+        self.buckets.setdefault(self._key(poi.x, poi.y), {})[poi.id] = poi
+
+    def remove(self, poi):
+        key = self._key(poi.x, poi.y)
+        bucket = self.buckets.get(key)
+        if bucket is not None:
+            bucket.pop(poi.id, None)
+            if not bucket:
+                del self.buckets[key]
+
+    def cell_bounds(self, cx: int, cy: int) -> Tuple[int, int, int, int]:
+        #Inclusive integer bounds of a cell
+        s = self.cell_size
+        return (cx * s, cy * s, cx * s + s - 1, cy * s + s - 1)
+
+    def cells_in_rect(self, x_min: float, y_min: float, x_max: float, y_max: float) -> Iterator[Tuple[int, int]]:
+        #Occupied cells overlapping the rectangle; walks whichever is smaller
+        c0, r0 = int(x_min // self.cell_size), int(y_min // self.cell_size)
+        c1, r1 = int(x_max // self.cell_size), int(y_max // self.cell_size)
+        if (c1 - c0 + 1) * (r1 - r0 + 1) > len(self.buckets):
+            for cx, cy in self.buckets:
+                if c0 <= cx <= c1 and r0 <= cy <= r1:
+                    yield (cx, cy)
+        else:
+            for cy in range(r0, r1 + 1):
+                for cx in range(c0, c1 + 1):
+                    if (cx, cy) in self.buckets:
+                        yield (cx, cy)
+
+
+def point_in_polygon(x: float, y: float, polygon: Sequence[Point]) -> bool:
+    """Even-odd ray casting; points on an edge count as inside"""
+    inside = False
+    n = len(polygon)
+    for i in range(n):
+        x1, y1 = polygon[i]
+        x2, y2 = polygon[(i + 1) % n]
+        if _on_segment(x, y, x1, y1, x2, y2):
+            return True
+        if (y1 > y) != (y2 > y):
+            x_cross = x1 + (y - y1) * (x2 - x1) / (y2 - y1)
+            if x < x_cross:
+                inside = not inside
+    return inside
+
+
+def _on_segment(px: float, py: float, x1: float, y1: float, x2: float, y2: float) -> bool:
+    if (x2 - x1) * (py - y1) != (y2 - y1) * (px - x1):
+        return False
+    return min(x1, x2) <= px <= max(x1, x2) and min(y1, y2) <= py <= max(y1, y2)
+
+
+def segment_touches_rect(x1: float, y1: float, x2: float, y2: float,
+                         rx0: float, ry0: float, rx1: float, ry1: float) -> bool:
+    """Liang-Barsky clip: does the segment intersect the closed rectangle?"""
+    dx, dy = x2 - x1, y2 - y1
+    t0, t1 = 0.0, 1.0
+    for p, q in ((-dx, x1 - rx0), (dx, rx1 - x1), (-dy, y1 - ry0), (dy, ry1 - y1)):
+        if p == 0:
+            if q < 0:
+                return False
+        else:
+            t = q / p
+            if p < 0:
+                t0 = max(t0, t)
+            else:
+                t1 = min(t1, t)
+            if t0 > t1:
+                return False
+    return True
+
+
+def classify_cell(polygon: Sequence[Point], bounds: Tuple[int, int, int, int]) -> str:
+    """'inside', 'outside' or 'boundary' for a cell against a polygon"""
+    rx0, ry0, rx1, ry1 = bounds
+    n = len(polygon)
+    for i in range(n):
+        x1, y1 = polygon[i]
+        x2, y2 = polygon[(i + 1) % n]
+        if segment_touches_rect(x1, y1, x2, y2, rx0, ry0, rx1, ry1):
+            return 'boundary'
+    # No edge crosses the cell, so it lies entirely on one side
+    return 'inside' if point_in_polygon(rx0, ry0, polygon) else 'outside'
+
+
+def polygon_bounds(polygon: Sequence[Point]) -> Tuple[float, float, float, float]:
+    xs = [p[0] for p in polygon]
+    ys = [p[1] for p in polygon]
+    return (min(xs), min(ys), max(xs), max(ys))
+
+
+def polygon_candidates(grid: SpatialGrid, polygon: Sequence[Point]) -> List:
+    """POIs inside a polygon: interior cells in bulk, exact tests on boundary cells only"""
+    results = []
+    x_min, y_min, x_max, y_max = polygon_bounds(polygon)
+    for cx, cy in grid.cells_in_rect(x_min, y_min, x_max, y_max):
+        bucket = grid.buckets[(cx, cy)]
+        state = classify_cell(polygon, grid.cell_bounds(cx, cy))
+        if state == 'inside':
+            results.extend(bucket.values())
+        elif state == 'boundary':
+            results.extend(poi for poi in bucket.values() if point_in_polygon(poi.x, poi.y, polygon))
+    return results
+
+
+# Offsets covering each unordered pair of neighbouring cells exactly once
+_HALF_NEIGHBOURHOOD = ((1, -1), (1, 0), (1, 1), (0, 1))
+
+
+def pairs_within(pois: Iterable, distance: float, epsilon: float = 1e-6) -> Iterator[Tuple[int, int, float]]:
+    """Lazily yield (id1, id2, d) for every POI pair with d <= distance, id1 < id2.
+
+    POIs are bucketed into cells at least `distance` wide, so each POI is only
+    compared with its own and neighbouring cells.
+    """
+    limit = distance + epsilon
+    cell = max(limit, 1.0)
+    buckets: Dict[Tuple[int, int], list] = {}
+    for poi in pois:
+        buckets.setdefault((int(poi.x // cell), int(poi.y // cell)), []).append(poi)
+
+    for (cx, cy), bucket in buckets.items():
+        for i, a in enumerate(bucket):
+            for b in bucket[i + 1:]:
+                d = math.hypot(a.x - b.x, a.y - b.y)
+                if d < limit:
+                    yield _ordered_pair(a.id, b.id, d)
+        for dx, dy in _HALF_NEIGHBOURHOOD:
+            other = buckets.get((cx + dx, cy + dy))
+            if not other:
+                continue
+            for a in bucket:
+                for b in other:
+                    d = math.hypot(a.x - b.x, a.y - b.y)
+                    if d < limit:
+                        yield _ordered_pair(a.id, b.id, d)
+
+
+def _ordered_pair(id1: int, id2: int, d: float) -> Tuple[int, int, float]:
+    return (id1, id2, d) if id1 < id2 else (id2, id1, d)
+
+
+def connected_components(pairs: Iterable[Tuple[int, int, float]]) -> List[List[int]]:
+    """Union-find over (id1, id2, d) edges; returns sorted components of size >= 2"""
+    parent: Dict[int, int] = {}
+
+    def find(a: int) -> int:
+        root = a
+        while parent[root] != root:
+            root = parent[root]
+        while parent[a] != root:
+            parent[a], a = root, parent[a]
+        return root
+
+    for id1, id2, _ in pairs:
+        parent.setdefault(id1, id1)
+        parent.setdefault(id2, id2)
+        r1, r2 = find(id1), find(id2)
+        if r1 != r2:
+            parent[max(r1, r2)] = min(r1, r2)
+
+    groups: Dict[int, List[int]] = {}
+    for node in parent:
+        groups.setdefault(find(node), []).append(node)
+    return sorted((sorted(g) for g in groups.values()), key=lambda g: g[0])
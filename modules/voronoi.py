@@ -0,0 +1,232 @@
+from array import array
+from bisect import bisect_left, bisect_right, insort
+from typing import Dict, List, Optional, Tuple
+
+NO_POI = -1
+
+
+class NearestRaster:
+    """Discrete Voronoi raster: every map cell stores the id of its nearest POI.
+
+    Built with a separable exact Euclidean distance transform: per column the
+    nearest site row comes from a sorted list of site rows, then each map row
+    takes the lower envelope of the per-column parabolas (Felzenszwalb &
+    Huttenlocher).
+
+    Updates stay local. A POI at (x, y) can only own cells in rows whose nearest
+    site in column x is y, and within such a row the cells it wins form one
+    interval. Adding a POI claims that interval; removing one refills only the
+    cells it owned, from the columns that can still reach them.
+
+    Memory is 4 bytes per cell (4 MB for the default 1000x1000 map).
+    """
+
+    def __init__(self, map_size: int):
+        self.map_size = map_size
+        self.owner = array('i', [NO_POI]) * (map_size * map_size)
+        self._columns: Dict[int, List[int]] = {}
+        self._xs: List[int] = []
+        self._site_ids: Dict[Tuple[int, int], List[int]] = {}
+        self._coords: Dict[int, Tuple[int, int]] = {}
+
+    def nearest(self, x: int, y: int) -> Optional[int]:
+        poi_id = self.owner[y * self.map_size + x]
+        return None if poi_id == NO_POI else poi_id
+
+    def build(self, pois):
+        for poi in pois:
+            self._add_site(poi)
+        for j in range(self.map_size):
+            self._fill_row(j, 0, self.map_size - 1)
+
+    def add(self, poi):
+        key = (poi.x, poi.y)
+        old_rep = min(self._site_ids[key]) if key in self._site_ids else None
+        self._add_site(poi)
+        if old_rep is not None:
+            # Same coordinates as an existing site: only the label can change
+            if poi.id < old_rep:
+                for j in self._dirty_rows(poi.x, poi.y):
+                    self._relabel_row(j, old_rep, poi.id)
+            return
+        for j in self._dirty_rows(poi.x, poi.y):
+            self._claim_row(j, poi.x, poi.y, poi.id)
+
+    def remove(self, poi):
+        key = (poi.x, poi.y)
+        ids = self._site_ids.get(key)
+        if not ids or poi.id not in ids:
+            return
+        rep = min(ids)
+        ids.remove(poi.id)
+        del self._coords[poi.id]
+        if ids:
+            if poi.id == rep:
+                for j in self._dirty_rows(poi.x, poi.y):
+                    self._relabel_row(j, rep, min(ids))
+            return
+        del self._site_ids[key]
+        rows = self._columns[poi.x]
+        rows.pop(bisect_left(rows, poi.y))
+        if not rows:
+            del self._columns[poi.x]
+            self._xs.pop(bisect_left(self._xs, poi.x))
+        for j in self._dirty_rows(poi.x, poi.y):
+            self._release_row(j, rep, poi.x)
+
+    def _add_site(self, poi):
+        key = (poi.x, poi.y)
+        self._coords[poi.id] = key
+        if key in self._site_ids:
+            self._site_ids[key].append(poi.id)
+            return
+        self._site_ids[key] = [poi.id]
+        rows = self._columns.get(poi.x)
+        if rows is None:
+            rows = self._columns[poi.x] = []
+            insort(self._xs, poi.x)
+        insort(rows, poi.y)
+
+    def _dirty_rows(self, x: int, y: int) -> range:
+        #Rows whose nearest site in column x is (or was) row y: between the midpoints to its neighbours
+        rows = self._columns.get(x, [])
+        k = bisect_left(rows, y)
+        below = rows[k - 1] if k > 0 else None
+        above_k = k + 1 if k < len(rows) and rows[k] == y else k
+        above = rows[above_k] if above_k < len(rows) else None
+        lo = (below + y) // 2 if below is not None else 0
+        hi = (y + above + 1) // 2 if above is not None else self.map_size - 1
+        return range(max(lo, 0), min(hi, self.map_size - 1) + 1)
+
+    def _column_site(self, x: int, j: int) -> int:
+        #Nearest site row to row j in an occupied column
+        rows = self._columns[x]
+        k = bisect_left(rows, j)
+        if k == len(rows) or (k > 0 and j - rows[k - 1] <= rows[k] - j):
+            k -= 1
+        return rows[k]
+
+    def _sq_dist(self, poi_id: int, i: int, j: int) -> float:
+        if poi_id == NO_POI:
+            return float('inf')
+        sx, sy = self._coords[poi_id]
+        return (sx - i) ** 2 + (sy - j) ** 2
+
+    def _claim_row(self, j: int, x: int, y: int, poi_id: int):
+        #Cells where the new site is strictly closer form one interval:
+        #gain(i) = new(i) - current(i) is a max of linear functions, hence convex
+        n = self.map_size
+        base = j * n
+        owner = self.owner
+        h = (y - j) ** 2
+
+        def gain(i):
+            return (i - x) ** 2 + h - self._sq_dist(owner[base + i], i, j)
+
+        i = x
+        g = gain(i)
+        while True:
+            if i > 0 and gain(i - 1) < g:
+                i -= 1
+            elif i < n - 1 and gain(i + 1) < g:
+                i += 1
+            else:
+                break
+            g = gain(i)
+        if g >= 0:
+            return
+        a = i
+        while a > 0 and gain(a - 1) < 0:
+            a -= 1
+        b = i
+        while b < n - 1 and gain(b + 1) < 0:
+            b += 1
+        owner[base + a:base + b + 1] = array('i', [poi_id]) * (b - a + 1)
+
+    def _relabel_row(self, j: int, old: int, new: int):
+        owner = self.owner
+        start, stop = j * self.map_size, (j + 1) * self.map_size
+        while True:
+            try:
+                start = owner.index(old, start, stop)
+            except ValueError:
+                return
+            owner[start] = new
+            start += 1
+
+    def _release_row(self, j: int, old: int, x: int):
+        #Refill each run of cells owned by the removed site
+        n = self.map_size
+        base = j * n
+        owner = self.owner
+        start = base
+        while True:
+            try:
+                start = owner.index(old, start, base + n)
+            except ValueError:
+                return
+            end = start
+            while end + 1 < base + n and owner[end + 1] == old:
+                end += 1
+            a, b = start - base, end - base
+
+            # Any remaining site bounds the new distance over [a, b]; columns
+            # further away than that bound cannot win any of these cells
+            reach = float('inf')
+            candidates = []
+            if a > 0:
+                candidates.append(owner[base + a - 1])
+            if b < n - 1:
+                candidates.append(owner[base + b + 1])
+            if x in self._columns:
+                candidates.append(min(self._site_ids[(x, self._column_site(x, j))]))
+            for site in candidates:
+                if site != NO_POI:
+                    reach = min(reach, max(self._sq_dist(site, a, j), self._sq_dist(site, b, j)))
+            if reach == float('inf'):
+                self._fill_row(j, a, b)
+            else:
+                r = int(reach ** 0.5) + 1
+                self._fill_row(j, a, b, a - r, b + r)
+            start = end + 1
+
+    def _fill_row(self, j: int, lo: int, hi: int, x_lo: Optional[int] = None, x_hi: Optional[int] = None):
+        #Assign cells lo..hi of row j from the lower envelope of the columns in [x_lo, x_hi]
+        base = j * self.map_size
+        owner = self.owner
+        xs = self._xs
+        first = 0 if x_lo is None else bisect_left(xs, x_lo)
+        last = len(xs) if x_hi is None else bisect_right(xs, x_hi)
+
+        # Nearest site row in every occupied column -> parabola (x, g^2)
+        sites = []
+        for x in xs[first:last]:
+            sy = self._column_site(x, j)
+            sites.append((x, (sy - j) ** 2, min(self._site_ids[(x, sy)])))
+
+        if not sites:
+            owner[base + lo:base + hi + 1] = array('i', [NO_POI]) * (hi - lo + 1)
+            return
+
+        # Lower envelope of f_k(i) = (i - x_k)^2 + h_k
+        hull = [sites[0]]
+        bounds = [float('-inf')]
+        for site in sites[1:]:
+            sx, sh, _ = site
+            while True:
+                vx, vh, _ = hull[-1]
+                s = ((sh + sx * sx) - (vh + vx * vx)) / (2 * sx - 2 * vx)
+                if s <= bounds[-1] and len(hull) > 1:
+                    hull.pop()
+                    bounds.pop()
+                else:
+                    break
+            hull.append(site)
+            bounds.append(s)
+
+        k = 0
+        last_k = len(hull) - 1
+        for i in range(lo, hi + 1):
+            while k < last_k and bounds[k + 1] < i:
+                k += 1
+            owner[base + i] = hull[k][2]
@@ -1,5 +1,8 @@
 from models import POIManager
+from sharding import ShardedPOIManager
+import json
 import tempfile
+import threading
 import yaml
 import os
 
@@ -264,6 +267,708 @@ def test_9_error_handling():
     print("   ✓ Error handling works correctly")
     return True
 
+def test_10_density_raster():
+    """Extension Test 4: Check raster rectangle counts and heatmap export"""
+    print("=== Extension Test 4: Density Raster ===")
+    
+    manager = POIManager()
+    manager.add_poi_type("cafe")
+    manager.add_poi_type("park")
+    manager.add_poi("Cafe A", "cafe", 10, 10)
+    manager.add_poi("Cafe B", "cafe", 20, 30)
+    manager.add_poi("Park", "park", 500, 500)
+    manager.enable_density_raster()
+    
+    if manager.count_poi_in_rect(0, 0, 100, 100) != 2:
+        raise Exception("Expected 2 POIs in rectangle")
+    
+    if manager.count_poi_in_rect(0, 0, 999, 999, "park") != 1:
+        raise Exception("Expected 1 park on the map")
+    
+    # Writes after the first query must be reflected
+    manager.add_poi("Cafe C", "cafe", 10, 10)
+    cafe_ids = [poi.id for poi in manager.get_poi_by_type("cafe")]
+    manager.delete_poi(cafe_ids[1])
+    if manager.count_poi_in_rect(10, 10, 10, 10, "cafe") != 2:
+        raise Exception("Raster not updated after add/delete")
+    
+    # Coarser cells: the heatmap has one entry per 100x100 cell
+    manager.enable_density_raster(cell_size=100)
+    heatmap = manager.get_density_heatmap()
+    if len(heatmap) != 10 or heatmap[0][0] != 2 or heatmap[5][5] != 1:
+        raise Exception("Heatmap counts are wrong")
+    
+    # Rectangles not aligned to 100x100 cells are still counted exactly
+    if manager.count_poi_in_rect(0, 0, 15, 15) != 2 or manager.count_poi_in_rect(11, 0, 99, 99) != 0:
+        raise Exception("Counts with coarse cells must stay exact")
+    
+    print("   ✓ Density raster works")
+    return True
+
+def test_11_range_queries():
+    """Extension Test 5: Check rectangle, polygon and region join queries"""
+    print("=== Extension Test 5: Range Queries ===")
+    
+    manager = POIManager()
+    manager.add_poi_type("test")
+    coords = [(10, 10), (60, 60), (149, 20), (300, 300), (120, 120)]
+    for i, (x, y) in enumerate(coords):
+        manager.add_poi(f"POI {i}", "test", x, y)
+    
+    rect = manager.find_poi_in_rect(0, 0, 149, 100)
+    if sorted(r[2] for r in rect) != [(10, 10), (60, 60), (149, 20)]:
+        raise Exception(f"Unexpected rectangle result: {rect}")
+    
+    # Triangle below the diagonal: (10,10) and (120,120) lie on its edge
+    triangle = [(0, 0), (200, 0), (200, 200)]
+    inside = manager.find_poi_in_polygon(triangle)
+    expected = sorted((x, y) for x, y in coords if x <= 200 and y <= x)
+    if sorted(r[2] for r in inside) != expected:
+        raise Exception(f"Unexpected polygon result: {inside}")
+    
+    regions = {"north": [(0, 0), (999, 0), (999, 100), (0, 100)],
+               "south": [(0, 200), (999, 200), (999, 999), (0, 999)]}
+    assignment = manager.assign_pois_to_regions(regions)
+    if sorted(assignment.values()) != ["north", "north", "north", "south"]:
+        raise Exception(f"Unexpected region assignment: {assignment}")
+    
+    print("   ✓ Range queries work")
+    return True
+
+def test_12_pairs_within_distance():
+    """Extension Test 6: Check the spatial self-join and duplicate clustering"""
+    print("=== Extension Test 6: Pairs Within Distance ===")
+    
+    manager = POIManager()
+    manager.add_poi_type("test")
+    for x, y in [(100, 100), (100, 100), (103, 104), (500, 500), (900, 10)]:
+        manager.add_poi("POI", "test", x, y)
+    ids = list(manager.pois.keys())
+    
+    pairs = sorted(manager.find_poi_pairs_within(5.0))
+    expected = [(ids[0], ids[1], 0.0), (ids[0], ids[2], 5.0), (ids[1], ids[2], 5.0)]
+    if pairs != expected:
+        raise Exception(f"Unexpected pairs: {pairs}")
+    
+    # Exact duplicates only
+    clusters = manager.cluster_poi(0)
+    if clusters != [[ids[0], ids[1]]]:
+        raise Exception(f"Unexpected duplicate clusters: {clusters}")
+    
+    if manager.cluster_poi(5.0) != [[ids[0], ids[1], ids[2]]]:
+        raise Exception("Unexpected clusters at distance 5")
+    
+    print("   ✓ Pairs within distance work")
+    return True
+
+def test_13_nearest_raster():
+    """Extension Test 7: Check 1-NN lookups through the nearest-POI raster"""
+    print("=== Extension Test 7: Nearest Raster ===")
+    
+    manager = POIManager()
+    manager.map_size = 50
+    manager.add_poi_type("test")
+    for x, y in [(5, 5), (40, 10), (25, 45)]:
+        manager.add_poi("POI", "test", x, y)
+    manager.enable_nearest_raster()
+    
+    def check():
+        for x in range(0, 50, 7):
+            for y in range(0, 50, 7):
+                expected = min(manager._calculate_distance(p.x, p.y, x, y) for p in manager.pois.values())
+                (poi, distance), = manager.find_k_closest_poi(x, y, 1)
+                if not manager._floating_point_equals(distance, expected):
+                    raise Exception(f"Wrong nearest POI for ({x},{y})")
+    
+    check()
+    
+    # Local updates after add/delete
+    manager.add_poi("New", "test", 20, 20)
+    manager.delete_poi(list(manager.pois.keys())[0])
+    check()
+    
+    print("   ✓ Nearest raster works")
+    return True
+
+def test_14_lazy_attribute_schema():
+    """Extension Test 8: Check schema changes resolve lazily on existing POIs"""
+    print("=== Extension Test 8: Lazy Attribute Schema ===")
+    
+    manager = POIManager()
+    manager.add_poi_type("museum")
+    manager.add_attribute_to_type("museum", "theme")
+    manager.add_poi("Museum", "museum", 100, 100, {"theme": "Art", "note": "extra"})
+    poi = list(manager.pois.values())[0]
+    
+    if poi.attributes != {"theme": "Art", "note": "extra"}:
+        raise Exception(f"Unexpected attributes: {poi.attributes}")
+    
+    # New attribute shows up as None without touching stored values
+    manager.add_attribute_to_type("museum", "entry_fee")
+    if poi.attributes.get("entry_fee", "missing") is not None:
+        raise Exception("New attribute should default to None")
+    if len(poi._values) != 1:
+        raise Exception("Default values should not be stored per POI")
+    
+    manager.rename_attribute("museum", "theme", "topic")
+    if poi.attributes.get("topic") != "Art" or "theme" in poi.attributes:
+        raise Exception("Rename did not carry the value over")
+    
+    # Dropping and re-adding an attribute does not resurrect the old value
+    manager.delete_attribute_from_type("museum", "topic")
+    manager.add_attribute_to_type("museum", "topic")
+    if poi.attributes["topic"] is not None:
+        raise Exception("Re-added attribute should start empty")
+    if list(poi.attributes) != ["entry_fee", "topic", "note"]:
+        raise Exception(f"Unexpected attribute order: {list(poi.attributes)}")
+    
+    # A value set before its key joined the schema goes away with the attribute
+    manager.add_attribute_to_type("museum", "note")
+    manager.delete_attribute_from_type("museum", "note")
+    if "note" in poi.attributes:
+        raise Exception("Deleted attribute should drop the pre-existing value")
+    
+    # Attributes still behave like a plain dict
+    copied = poi.attributes.copy()
+    copied["entry_fee"] = 5
+    if type(copied) is not dict or poi.attributes["entry_fee"] is not None:
+        raise Exception("copy() should return an independent plain dict")
+    if not isinstance(poi.attributes, dict) or json.loads(json.dumps(poi.attributes)) != {"entry_fee": None, "topic": None}:
+        raise Exception("Attributes should serialise to JSON")
+    
+    print("   ✓ Lazy attribute schema works")
+    return True
+
+def test_15_id_allocation():
+    """Extension Test 9: Check per-manager ids, explicit ids and reservation"""
+    print("=== Extension Test 9: ID Allocation ===")
+    
+    # Each manager numbers its own POIs from 1
+    for _ in range(2):
+        manager = POIManager()
+        manager.add_poi_type("test")
+        manager.add_poi("A", "test", 1, 1)
+        if list(manager.pois.keys()) != [1]:
+            raise Exception("Ids should be scoped to the manager")
+    
+    # Explicit ids are kept and skipped by the counter
+    manager.add_poi("B", "test", 2, 2, poi_id=3)
+    if manager.add_poi("Dup", "test", 2, 2, poi_id=3):
+        raise Exception("Duplicate explicit id should be rejected")
+    manager.add_poi("C", "test", 3, 3)
+    manager.add_poi("D", "test", 4, 4)
+    if sorted(manager.pois.keys()) != [1, 2, 3, 4]:
+        raise Exception(f"Unexpected ids: {sorted(manager.pois.keys())}")
+    
+    block = manager.reserve_poi_ids(3)
+    if list(block) != [5, 6, 7]:
+        raise Exception(f"Unexpected reserved block: {list(block)}")
+    manager.add_poi("E", "test", 5, 5)
+    if max(manager.pois.keys()) != 8:
+        raise Exception("Reserved ids should not be handed out again")
+    
+    # Opt-in reuse of deleted ids
+    reusing = POIManager(reuse_poi_ids=True)
+    reusing.add_poi_type("test")
+    reusing.add_poi("A", "test", 1, 1)
+    reusing.add_poi("B", "test", 2, 2)
+    reusing.delete_poi(1)
+    reusing.add_poi("C", "test", 3, 3)
+    if sorted(reusing.pois.keys()) != [1, 2]:
+        raise Exception("Deleted id should be reused when enabled")
+    
+    print("   ✓ ID allocation works")
+    return True
+
+def test_16_sharded_manager():
+    """Extension Test 10: Check sharded queries match a single manager"""
+    print("=== Extension Test 10: Sharded Manager ===")
+    
+    coords = [(10, 10), (48, 50), (52, 50), (90, 90), (30, 70), (70, 20)]
+    manager = POIManager()
+    manager.map_size = 100
+    manager.add_poi_type("test")
+    
+    with ShardedPOIManager(tiles_per_side=2, map_size=100) as sharded:
+        sharded.add_poi_type("test")
+        for x, y in coords:
+            manager.add_poi("POI", "test", x, y)
+            sharded.add_poi("POI", "test", x, y)
+        
+        # The closest pair straddles the tile border at x=50
+        pair = sharded.find_closest_poi_pair()
+        if pair is None or (pair[0].id, pair[1].id, pair[2]) != (2, 3, 4.0):
+            raise Exception(f"Unexpected closest pair: {pair}")
+        
+        expected = [r[0] for r in manager.find_poi_in_radius(50, 50, 30)]
+        if [r[0] for r in sharded.find_poi_in_radius(50, 50, 30)] != expected:
+            raise Exception("Radius query differs from single manager")
+        
+        expected = [poi.id for poi, _ in manager.find_k_closest_poi(20, 20, 3)]
+        if [poi.id for poi, _ in sharded.find_k_closest_poi(20, 20, 3)] != expected:
+            raise Exception("K closest query differs from single manager")
+        
+        sharded.delete_poi(2)
+        if sharded.find_closest_poi_pair()[2] == 4.0:
+            raise Exception("Deleted POI still visible")
+    
+    print("   ✓ Sharded manager works")
+    return True
+
+def test_17_approximate_cardinality():
+    """Extension Test 11: Check HyperLogLog popularity estimates"""
+    print("=== Extension Test 11: Approximate Cardinality ===")
+    
+    exact = POIManager()
+    approx = POIManager(cardinality_mode="approximate", cardinality_error=0.02)
+    for manager in (exact, approx):
+        manager.add_poi_type("test")
+        manager.add_poi("Hot", "test", 1, 1)
+        manager.add_poi("Quiet", "test", 2, 2)
+        for i in range(2000):
+            visitor = manager.add_visitor(f"V{i}", "KZ")
+            manager.add_visit(visitor.id, 1, "01/01/2025")
+            manager.add_visit(visitor.id, 1, "02/01/2025")
+            if i % 100 == 0:
+                manager.add_visit(visitor.id, 2, "03/01/2025")
+    
+    estimates = dict(approx.get_poi_popularity())
+    if dict(exact.get_poi_popularity()) != {1: 2000, 2: 20}:
+        raise Exception("Exact popularity changed")
+    if abs(estimates[1] - 2000) > 2000 * 0.1 or estimates[2] != 20:
+        raise Exception(f"Estimates too far off: {estimates}")
+    
+    top = approx.get_top_k_poi(1)
+    if top[0][0].name != "Hot":
+        raise Exception("Top POI should be Hot")
+    
+    # Sketches merge, e.g. across time buckets
+    merged = approx.get_poi_sketch(1).merge(approx.get_poi_sketch(2))
+    if abs(merged.count() - 2000) > 2000 * 0.1:
+        raise Exception("Merged sketch estimate too far off")
+    
+    # Nationality statistics use sketches too, not per-POI visitor sets
+    stats = approx._nationality_stats["KZ"][1]
+    if isinstance(stats.visitors, set):
+        raise Exception("Approximate mode should not keep exact visitor sets")
+    kz = dict((poi_id, unique) for poi_id, _, unique, _ in approx.get_nationality_poi_stats("KZ"))
+    if abs(kz[1] - 2000) > 2000 * 0.1 or kz[2] != 20:
+        raise Exception(f"Nationality estimates too far off: {kz}")
+    
+    print("   ✓ Approximate cardinality works")
+    return True
+
+def test_18_covisitation():
+    """Extension Test 12: Check "visitors who went here also went to" queries"""
+    print("=== Extension Test 12: Co-visitation ===")
+    
+    manager = POIManager()
+    manager.add_poi_type("test")
+    for i in range(4):
+        manager.add_poi(f"POI {i + 1}", "test", i, i)
+    
+    histories = [[1, 2, 3], [1, 2], [1, 3, 1], [4]]
+    visitors = [manager.add_visitor(f"V{i}", "KZ") for i in range(len(histories))]
+    for visitor, history in zip(visitors[:2], histories[:2]):
+        for poi_id in history:
+            manager.add_visit(visitor.id, poi_id, "01/01/2025")
+    
+    # Build from existing visits, then maintain incrementally
+    manager.enable_covisitation_index(chunk_size=1)
+    for visitor, history in zip(visitors[2:], histories[2:]):
+        for poi_id in history:
+            manager.add_visit(visitor.id, poi_id, "01/01/2025")
+    
+    result = [(poi.id, count) for poi, count in manager.get_covisited_poi(1, 5)]
+    if result != [(2, 2), (3, 2)]:
+        raise Exception(f"Unexpected co-visits: {result}")
+    
+    if manager.get_covisited_poi(4, 5) != []:
+        raise Exception("POI 4 has no co-visits")
+    
+    # Capped history: only the most recent distinct POI is paired
+    capped = manager.enable_covisitation_index(history_cap=1)
+    if capped.top_k(3, 5) != [(1, 1), (2, 1)]:
+        raise Exception(f"Unexpected capped co-visits: {capped.top_k(3, 5)}")
+    
+    # Visits added out of date order: incremental and rebuilt counts agree
+    late = manager.add_visitor("Late", "KZ")
+    for poi_id, date in [(4, "05/01/2025"), (2, "01/01/2025"), (3, "03/01/2025")]:
+        manager.add_visit(late.id, poi_id, date)
+    incremental = {poi_id: dict(row) for poi_id, row in capped.counts.items()}
+    rebuilt = manager.enable_covisitation_index(history_cap=1, chunk_size=2)
+    if rebuilt.counts != incremental:
+        raise Exception(f"Rebuild differs from incremental: {rebuilt.counts} vs {incremental}")
+    
+    print("   ✓ Co-visitation works")
+    return True
+
+def test_19_nationality_statistics():
+    """Extension Test 13: Check nationality index and grouped statistics"""
+    print("=== Extension Test 13: Nationality Statistics ===")
+    
+    manager = POIManager()
+    manager.add_poi_type("test")
+    manager.add_poi("A", "test", 1, 1)
+    manager.add_poi("B", "test", 2, 2)
+    kz1 = manager.add_visitor("Aruzhan", "Kazakhstan")
+    kz2 = manager.add_visitor("Eldana", "Kazakhstan")
+    us = manager.add_visitor("John", "USA")
+    
+    manager.add_visit(kz1.id, 1, "01/01/2025", 8)
+    manager.add_visit(kz1.id, 1, "02/01/2025", 6)
+    manager.add_visit(kz2.id, 1, "03/01/2025")
+    manager.add_visit(kz2.id, 2, "03/01/2025", 10)
+    manager.add_visit(us.id, 2, "04/01/2025", 5)
+    
+    if [v.id for v in manager.get_visitors_by_nationality("Kazakhstan")] != [kz1.id, kz2.id]:
+        raise Exception("Nationality index is wrong")
+    
+    stats = manager.get_nationality_poi_stats("Kazakhstan")
+    if stats != [(1, 3, 2, 7.0), (2, 1, 1, 10.0)]:
+        raise Exception(f"Unexpected grouped stats: {stats}")
+    
+    summary = {row[0]: row[1:] for row in manager.get_nationality_summary()}
+    if summary["USA"] != (1, 1, 1, 5.0) or summary["Kazakhstan"][2] != 2:
+        raise Exception(f"Unexpected summary: {summary}")
+    
+    top = manager.get_top_k_poi_by_nationality("USA", 1)
+    if top[0][0].name != "B":
+        raise Exception("Top POI for USA should be B")
+    
+    print("   ✓ Nationality statistics work")
+    return True
+
+def test_20_paginated_history():
+    """Extension Test 14: Check date-ordered, cursor-paginated visit history"""
+    print("=== Extension Test 14: Paginated History ===")
+    
+    manager = POIManager()
+    manager.add_poi_type("test")
+    manager.add_poi("A", "test", 1, 1)
+    manager.add_poi("B", "test", 2, 2)
+    visitor = manager.add_visitor("John", "USA")
+    
+    dates = ["05/01/2025", "01/01/2025", "03/02/2024", "01/01/2025", "10/12/2025"]
+    for i, date in enumerate(dates):
+        manager.add_visit(visitor.id, 1 + i % 2, date)
+    
+    ordered = [visit.date for visit in manager.get_visitor_history(visitor.id)]
+    if ordered != ["03/02/2024", "01/01/2025", "01/01/2025", "05/01/2025", "10/12/2025"]:
+        raise Exception(f"History not sorted by date: {ordered}")
+    
+    page, cursor = manager.get_visitor_history_page(visitor.id, limit=2)
+    if [name for _, name in page] != ["A", "B"] or cursor is None:
+        raise Exception("Unexpected first page")
+    
+    # A visit added between pages is picked up, nothing is repeated
+    manager.add_visit(visitor.id, 2, "02/01/2025")
+    seen = [visit.date for visit, _ in page]
+    while cursor is not None:
+        page, cursor = manager.get_visitor_history_page(visitor.id, cursor, limit=2)
+        seen.extend(visit.date for visit, _ in page)
+    if seen != ["03/02/2024", "01/01/2025", "01/01/2025", "02/01/2025", "05/01/2025", "10/12/2025"]:
+        raise Exception(f"Unexpected pages: {seen}")
+    
+    # An empty page would end paging early, so limit must be positive
+    try:
+        manager.get_visitor_history_page(visitor.id, limit=0)
+        raise Exception("limit=0 should be rejected")
+    except ValueError:
+        pass
+    
+    print("   ✓ Paginated history works")
+    return True
+
+def test_21_config_reload():
+    """Extension Test 15: Check config reload applies only the differences"""
+    print("=== Extension Test 15: Config Reload ===")
+    
+    config = {
+        'poi_types': {'restaurant': ['cuisine'], 'park': ['size']},
+        'pois': [
+            {'id': 1, 'name': 'Aqqu', 'type': 'restaurant', 'x': 100, 'y': 200, 'cuisine': 'Kazakh'},
+            {'id': 2, 'name': 'Sairan', 'type': 'park', 'x': 500, 'y': 600, 'size': 'large'},
+            {'id': 3, 'name': 'Old', 'type': 'park', 'x': 1, 'y': 1},
+        ],
+        'visitors': [
+            {'name': 'Aruzhan', 'nationality': 'Kazakhstan',
+             'visits': [{'poi_id': 1, 'date': '15/09/2025', 'rating': 8}]},
+        ],
+    }
+    
+    with tempfile.NamedTemporaryFile(mode='w', suffix='.yaml', delete=False) as f:
+        yaml.dump(config, f)
+        temp_path = f.name
+    
+    try:
+        manager = POIManager()
+        manager.load_config(temp_path)
+        aqqu = manager.pois[1]
+        
+        # Reloading an unchanged file changes nothing and adds no duplicates
+        changes = manager.reload_config(temp_path)
+        if any(changes.values()) or len(manager.pois) != 3 or len(manager.visitors) != 1:
+            raise Exception(f"Unchanged reload applied changes: {changes}")
+        
+        config['poi_types']['restaurant'] = ['cuisine', 'price_range']
+        config['pois'][0]['cuisine'] = 'Fusion'
+        config['pois'][1]['x'] = 510
+        del config['pois'][2]
+        config['pois'].append({'id': 7, 'name': 'New', 'type': 'restaurant', 'x': 5, 'y': 5})
+        config['visitors'][0]['visits'].append({'poi_id': 7, 'date': '16/09/2025'})
+        with open(temp_path, 'w') as f:
+            yaml.dump(config, f)
+        
+        changes = manager.reload_config(temp_path)
+        expected = {'attributes_added': 1, 'pois_added': 1, 'pois_updated': 2, 'pois_removed': 1, 'visits_added': 1}
+        if {k: v for k, v in changes.items() if v} != expected:
+            raise Exception(f"Unexpected changes: {changes}")
+        
+        if manager.pois[1] is not aqqu or aqqu.attributes['cuisine'] != 'Fusion':
+            raise Exception("Attribute change should be applied in place")
+        if sorted(manager.pois) != [1, 2, 7] or manager.pois[2].x != 510:
+            raise Exception("POI inserts, moves and deletes not applied")
+        if [r[0] for r in manager.find_poi_in_rect(505, 595, 515, 605)] != [2]:
+            raise Exception("Moved POI not re-indexed")
+        if len(manager.visitors[1].visits) != 2:
+            raise Exception("New visit not applied")
+        
+        # A nationality change moves the visitor and its visit statistics
+        config['visitors'][0]['nationality'] = 'Turkey'
+        with open(temp_path, 'w') as f:
+            yaml.dump(config, f)
+        changes = manager.reload_config(temp_path)
+        if {k: v for k, v in changes.items() if v} != {'visitors_updated': 1}:
+            raise Exception(f"Unexpected changes: {changes}")
+        if manager.get_visitors_by_nationality('Kazakhstan') or manager.get_nationality_poi_stats('Kazakhstan'):
+            raise Exception("Old nationality should be empty")
+        if [row[:3] for row in manager.get_nationality_poi_stats('Turkey')] != [(1, 1, 1), (7, 1, 1)]:
+            raise Exception("Visit statistics should follow the visitor")
+        
+        # A malformed file is rejected before anything is applied
+        with open(temp_path, 'w') as f:
+            f.write("poi_types:\n  park:\npois: []\n")
+        if manager.reload_config(temp_path) is not None or sorted(manager.pois) != [1, 2, 7]:
+            raise Exception("Malformed reload should change nothing")
+        
+        # So is an empty (e.g. half-written) file
+        for content in ("", "null\n"):
+            with open(temp_path, 'w') as f:
+                f.write(content)
+            if manager.reload_config(temp_path) is not None or sorted(manager.pois) != [1, 2, 7]:
+                raise Exception("Empty reload should change nothing")
+        
+        # Id-less entries sharing a name stay distinct across reloads
+        twins = {
+            'poi_types': {'park': []},
+            'pois': [{'name': 'Green', 'type': 'park', 'x': 1, 'y': 1},
+                     {'name': 'Green', 'type': 'park', 'x': 2, 'y': 2}],
+            'visitors': [{'name': 'John', 'nationality': 'US', 'visits': [{'poi_id': 1, 'date': '01/01/2025'}]},
+                         {'name': 'John', 'nationality': 'UK', 'visits': [{'poi_id': 2, 'date': '02/01/2025'}]}],
+        }
+        with open(temp_path, 'w') as f:
+            yaml.dump(twins, f)
+        twin_manager = POIManager()
+        twin_manager.load_config(temp_path)
+        changes = twin_manager.reload_config(temp_path)
+        if any(changes.values()):
+            raise Exception(f"Unchanged reload with same-name entries applied changes: {changes}")
+        twins['pois'][0]['x'] = 3
+        with open(temp_path, 'w') as f:
+            yaml.dump(twins, f)
+        changes = twin_manager.reload_config(temp_path)
+        if {k: v for k, v in changes.items() if v} != {'pois_updated': 1} or twin_manager.pois[1].x != 3:
+            raise Exception(f"Edit of the first same-name POI not applied: {changes}")
+        if [v.nationality for v in twin_manager.visitors.values()] != ['US', 'UK']:
+            raise Exception("Same-name visitors should keep their own nationality")
+    finally:
+        os.unlink(temp_path)
+    
+    print("   ✓ Config reload works")
+    return True
+
+def test_22_change_feed():
+    """Extension Test 16: Check batched, replayable mutation events"""
+    print("=== Extension Test 16: Change Feed ===")
+    
+    manager = POIManager(change_retention=100)
+    manager.add_poi_type("test")
+    start = manager.change_seq
+    
+    pois = manager.subscribe_changes(kinds={"poi_added", "poi_deleted"})
+    manager.add_poi("A", "test", 1, 1)
+    manager.add_attribute_to_type("test", "size")
+    manager.add_poi("B", "test", 2, 2)
+    manager.delete_poi(1)
+    
+    # Events are buffered until a batch fills or the consumer polls
+    batch = pois.poll()
+    if [(e.kind, e.data["id"]) for e in batch] != [("poi_added", 1), ("poi_added", 2), ("poi_deleted", 1)]:
+        raise Exception(f"Unexpected batch: {batch}")
+    if [e.seq for e in batch] != sorted(e.seq for e in batch) or pois.poll() is not None:
+        raise Exception("Events should arrive once, in sequence order")
+    
+    # A late subscriber replays from a sequence number
+    late = manager.subscribe_changes(from_seq=start + 1)
+    kinds = [e.kind for e in late.poll()]
+    if kinds != ["poi_added", "attribute_added", "poi_added", "poi_deleted"]:
+        raise Exception(f"Unexpected replay: {kinds}")
+    
+    # Full queue: the subscriber is dropped instead of blocking the producer
+    slow = manager.subscribe_changes(maxsize=1)
+    manager.add_poi("C", "test", 3, 3)
+    manager.flush_changes()
+    manager.add_poi("D", "test", 4, 4)
+    manager.flush_changes()
+    if not slow.lagged:
+        raise Exception("Overflowing subscriber should be marked lagged")
+    slow.poll()
+    missed = manager.replay_changes(slow.last_seq + 1)
+    if [e.data["name"] for e in missed] != ["D"]:
+        raise Exception("Lagged subscriber should be able to replay what it missed")
+    
+    # Writing far past maxsize without polling must not hang the writer
+    busy = POIManager()
+    busy.add_poi_type("test")
+    idle = busy.subscribe_changes(maxsize=2)
+    writer = threading.Thread(target=lambda: [busy.add_poi(f"P{i}", "test", i % 1000, 0) for i in range(400)],
+                              daemon=True)
+    writer.start()
+    writer.join(5)
+    if writer.is_alive() or len(busy.pois) != 400 or not idle.lagged:
+        raise Exception("Overflowing subscriber should be dropped, not block add_poi")
+    if busy._changes._log or busy.change_seq != 401:
+        raise Exception("Without retention no events should be kept")
+    
+    print("   ✓ Change feed works")
+    return True
+
+def test_23_streaming_export():
+    """Extension Test 17: Check YAML/JSONL/CSV export and YAML round trip"""
+    print("=== Extension Test 17: Streaming Export ===")
+    
+    manager = POIManager()
+    manager.add_poi_type("restaurant")
+    manager.add_attribute_to_type("restaurant", "cuisine")
+    manager.add_poi_type("park")
+    manager.add_poi("Aqqu", "restaurant", 100, 200, {"cuisine": "Kazakh"})
+    manager.add_poi("Sairan", "park", 500, 600)
+    visitor = manager.add_visitor("Aruzhan", "Kazakhstan")
+    manager.add_visit(visitor.id, 1, "15/09/2025", 8)
+    manager.add_visit(visitor.id, 2, "16/09/2025")
+    
+    directory = tempfile.mkdtemp()
+    try:
+        yaml_path = os.path.join(directory, "state.yaml")
+        if manager.export_state(yaml_path, chunk_size=1) != 5:
+            raise Exception("Expected 5 YAML records")
+        
+        restored = POIManager()
+        if not restored.load_config(yaml_path):
+            raise Exception("Exported YAML could not be loaded")
+        if restored.pois[1].attributes["cuisine"] != "Kazakh" or len(restored.visitors[1].visits) != 2:
+            raise Exception("Round trip lost data")
+        
+        jsonl_path = os.path.join(directory, "state.jsonl")
+        manager.export_state(jsonl_path, "jsonl", types=["park"])
+        with open(jsonl_path) as f:
+            kinds = [line.split('"kind": "')[1].split('"')[0] for line in f]
+        if kinds != ["poi_type", "poi", "visitor", "visit"]:
+            raise Exception(f"Unexpected filtered JSONL records: {kinds}")
+        
+        csv_path = os.path.join(directory, "pois.csv")
+        manager.export_state(csv_path, "csv", region=(0, 0, 200, 300))
+        with open(csv_path) as f:
+            lines = f.read().splitlines()
+        if lines != ["id,name,type,x,y,cuisine", "1,Aqqu,restaurant,100,200,Kazakh"]:
+            raise Exception(f"Unexpected CSV: {lines}")
+    finally:
+        for name in os.listdir(directory):
+            os.unlink(os.path.join(directory, name))
+        os.rmdir(directory)
+    
+    print("   ✓ Streaming export works")
+    return True
+
+def test_24_memory_report():
+    """Extension Test 18: Check per-structure memory accounting"""
+    print("=== Extension Test 18: Memory Report ===")
+    
+    manager = POIManager()
+    manager.add_poi_type("museum")
+    manager.add_attribute_to_type("museum", "ticket_price")
+    for i in range(50):
+        manager.add_poi(f"Museum {i}", "museum", i * 10, i * 10, {"ticket_price": i})
+    visitor = manager.add_visitor("Nurlan", "Kazakhstan")
+    for i in range(1, 21):
+        manager.add_visit(visitor.id, i, f"{i:02d}/03/2025", 5)
+    
+    report = manager.get_memory_report()
+    for name in ("pois", "poi_attributes", "visits", "visitors", "id_allocators", "spatial_grid", "total"):
+        if report.get(name, {}).get("bytes", 0) <= 0:
+            raise Exception(f"Missing or empty '{name}' entry: {report.get(name)}")
+    parts = sum(row["bytes"] for name, row in report.items() if name != "total")
+    if parts != report["total"]["bytes"]:
+        raise Exception("Structure sizes do not add up to the total")
+    
+    more = manager.add_visitor("Dana", "Kazakhstan")
+    for i in range(1, 21):
+        manager.add_visit(more.id, i, f"{i:02d}/04/2025")
+    if manager.get_memory_report()["visits"]["bytes"] <= report["visits"]["bytes"]:
+        raise Exception("Visits should grow with new visits")
+    
+    sampled = manager.get_memory_report(sample=10)
+    exact = manager.get_memory_report()
+    if abs(sampled["pois"]["bytes"] - exact["pois"]["bytes"]) > exact["pois"]["bytes"] * 0.25:
+        raise Exception(f"Sampled estimate too far off: {sampled['pois']} vs {exact['pois']}")
+    try:
+        manager.get_memory_report(sample=0)
+        raise Exception("sample=0 should be rejected")
+    except ValueError:
+        pass
+    
+    print("   ✓ Memory report works")
+    return True
+
+def test_25_morton_store():
+    """Extension Test 19: Check Morton-ordered store against the dict scan"""
+    print("=== Extension Test 19: Morton Store ===")
+    
+    manager = POIManager()
+    manager.add_poi_type("cafe")
+    coords = [(10, 10), (12, 15), (500, 500), (505, 498), (999, 0), (0, 999), (250, 750), (760, 240)]
+    for i, (x, y) in enumerate(coords):
+        manager.add_poi(f"Cafe {i}", "cafe", x, y)
+    
+    rects = [(0, 0, 20, 20), (490, 490, 510, 510), (0, 0, 999, 999), (300, 300, 400, 400)]
+    circles = [(10, 10, 5.39), (500, 500, 6), (0, 0, 1000)]
+    expected_rects = [manager.find_poi_in_rect(*rect) for rect in rects]
+    expected_circles = [manager.find_poi_in_radius(*circle) for circle in circles]
+    
+    store = manager.enable_morton_store(buffer_size=3)
+    if [sorted(row[0] for row in store.query_rect(*rect)) for rect in rects] != \
+            [[row[0] for row in rows] for rows in expected_rects]:
+        raise Exception("Store rectangle results differ from the grid")
+    if [manager.find_poi_in_radius(*circle) for circle in circles] != expected_circles:
+        raise Exception("Radius results differ from the dict scan")
+    
+    # Buffered inserts and tombstoned deletes are visible before a merge
+    manager.add_poi("Cafe new", "cafe", 11, 11)
+    manager.delete_poi(1)
+    ids = sorted(row[0] for row in store.query_rect(0, 0, 20, 20))
+    if ids != [2, 9]:
+        raise Exception(f"Expected [2, 9] after updates, got {ids}")
+    for i in range(5):
+        manager.add_poi(f"Filler {i}", "cafe", 900, 900 + i)
+    if len(manager._morton) != len(manager.pois) or manager._morton._buffer:
+        raise Exception("Store should have merged its buffer")
+    if [row[0] for row in manager.find_poi_in_radius(12, 12, 3)] != [9, 2]:
+        raise Exception("Radius query after merge is wrong")
+    
+    print("   ✓ Morton store works")
+    return True
+
 def run_all_tests():
     """Run all the tests and show results"""
     print("=" * 60)
@@ -280,7 +985,23 @@ def run_all_tests():
         test_6_id_management,
         test_7_attribute_renaming,
         test_8_type_renaming,
-        test_9_error_handling
+        test_9_error_handling,
+        test_10_density_raster,
+        test_11_range_queries,
+        test_12_pairs_within_distance,
+        test_13_nearest_raster,
+        test_14_lazy_attribute_schema,
+        test_15_id_allocation,
+        test_16_sharded_manager,
+        test_17_approximate_cardinality,
+        test_18_covisitation,
+        test_19_nationality_statistics,
+        test_20_paginated_history,
+        test_21_config_reload,
+        test_22_change_feed,
+        test_23_streaming_export,
+        test_24_memory_report,
+        test_25_morton_store
     ]
     
     passed = 0